@@ -3,37 +3,23 @@ import csv
 import statsmodels.api as sm
 import datetime
 import sys
+from simulation import simulate_paths, stockout_stress_test
 
 def get_resource_data():
     with open("../cleaned_avengers_data.csv", "r") as csvfile:
         reader = csv.DictReader(csvfile)
         return list(reader)
 
-# def simulate_paths(N, T, start_levels, beta1, sigma, alpha, z_empirical):
-#     t = np.arange(1, T + 1)
-#     paths = np.zeros((N, T))
-#     for i in range(N):
-#         z = np.random.choice(z_empirical, size=T, replace=True)
-#         noise = sigma * (t ** (alpha / 2)) * z
-#         paths[i] = start_levels[i] + beta1 * t + noise
-#     return paths
-
-def simulate_paths(N, T, start_levels, beta1, sigma, alpha, z_empirical):
-    t = np.arange(1, T + 1)
-    paths = np.zeros((N, T))
-    for i in range(N):
-        z = np.random.randn(T)  # fresh standard normal, not recycled empirical
-        noise = sigma * (t ** (alpha / 2)) * z
-        paths[i] = start_levels[i] + beta1 * t + noise
-    return paths
-
 # =====================================================
 # PARSE ARGS
 # =====================================================
 
+# add_thanos_snap.py M snapped [seed] [stress_paths]
 params = sys.argv[1:]
 M = int(params[0])
 snapped = params[1].lower() == "true"
+seed = int(params[2]) if len(params) > 2 else None
+stress_paths = int(params[3]) if len(params) > 3 else 0
 
 # =====================================================
 # LOAD AND STRUCTURE DATA
@@ -54,11 +40,8 @@ T_total = len(data_dict) // group_size
 
 # Build data matrix: shape (group_size, T_total)
 # Row i = time series for resource i
-data_matrix = np.zeros((group_size, T_total))
-for t_idx in range(T_total):
-    for r_idx in range(group_size):
-        row = data_dict[t_idx * group_size + r_idx]
-        data_matrix[r_idx, t_idx] = float(row["stock_level"])
+stock_levels = np.array([row["stock_level"] for row in data_dict[:T_total * group_size]], dtype=float)
+data_matrix = stock_levels.reshape(T_total, group_size).T
 
 # =====================================================
 # APPLY SNAP TO LAST TIMESTEP IF REQUESTED
@@ -157,11 +140,23 @@ z_empirical_trimmed = z_empirical[
 # 5. SIMULATE FUTURE PATHS
 # =====================================================
 
-# Generate simulated datasets
+# Generate simulated datasets (fresh standard normal shocks, not recycled empirical)
+rng = np.random.default_rng(seed)
 simulated_data = simulate_paths(
-    N_fit, M, snapped_point, beta1, sigma_hat, alpha_hat, z_empirical_trimmed
+    N_fit, M, snapped_point, beta1, sigma_hat, alpha_hat, rng=rng
 )
 
+# Optional stress test: many scenario paths per resource instead of one
+if stress_paths:
+    print(f"\n=== Stockout stress test ({stress_paths} paths x {M} steps) ===")
+    for r_idx in range(group_size):
+        stress = stockout_stress_test(
+            stress_paths, M, snapped_point[r_idx], beta1, sigma_hat, alpha_hat, seed=rng.integers(2**63)
+        )
+        print(f"{data_dict[-group_size + r_idx]['resource_type']}: "
+              f"P(stockout)={stress['p_stockout']:.3f}, "
+              f"step p5/p50/p95={stress['stockout_step_p5']}/{stress['stockout_step_p50']}/{stress['stockout_step_p95']}")
+
 # =====================================================
 # 6. WRITE OUTPUT
 # =====================================================
@@ -1,35 +1,148 @@
-import numpy as np
+import argparse
 import csv
+import datetime
+import itertools
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-def get_resource_data():
-    with open("../historical_avengers_data.csv", "r") as csvfile:
-        reader = csv.DictReader(csvfile)
-        return list(reader)
-
-def get_stock_data():
-    import datetime
-    stock_data = get_resource_data()
-    if not stock_data:
-        return stock_data
-
-    # Set group size to 5 (number of resources per timestamp)
-    group_size = 5
-    first_timestamp = stock_data[0]["timestamp"]
-    start_dt = datetime.datetime.fromisoformat(first_timestamp)
-
-    for i, row in enumerate(stock_data):
-        group_idx = i // group_size
-        new_dt = start_dt + datetime.timedelta(minutes=12 * group_idx)
-        row["timestamp"] = new_dt.strftime("%Y-%m-%dT%H:%M:%S")
-        if row["snap_event_detected"] == "True":
-            row["stock_level"] = str(2 * float(row["stock_level"]))
-    return stock_data
-
-data = get_stock_data()
-
-with open("../cleaned_avengers_data.csv", "w", newline="") as csvfile:
-    writer = csv.DictWriter(csvfile, fieldnames=data[0].keys())
-    writer.writeheader()
-
-    for row in data:
-        writer.writerow(row)
\ No newline at end of file
+# Number of resources per timestamp
+GROUP_SIZE = 5
+STEP = datetime.timedelta(minutes=12)
+TS_FORMAT = "%Y-%m-%dT%H:%M:%S"
+CHUNK_ROWS = 100_000
+
+
+def read_chunks(csvfile, chunk_rows=CHUNK_ROWS):
+    """Yield (index of the chunk's first row, rows) from a csv.reader, chunk_rows rows at a time."""
+    reader = csv.reader(csvfile)
+    start = 0
+    while True:
+        rows = list(itertools.islice(reader, chunk_rows))
+        if not rows:
+            return
+        yield start, rows
+        start += len(rows)
+
+
+# Row stages: each takes and yields (row index, row) pairs, so they compose in any order
+
+def regrid(rows, columns, start_dt):
+    """Put every group of GROUP_SIZE rows on a regular 12-minute grid from start_dt."""
+    ts = columns["timestamp"]
+    group, stamp = None, None
+    for i, row in rows:
+        if i // GROUP_SIZE != group:
+            group = i // GROUP_SIZE
+            stamp = (start_dt + STEP * group).strftime(TS_FORMAT)
+        row[ts] = stamp
+        yield i, row
+
+
+def unhalve(rows, columns):
+    """Undo the snap halving of stock_level."""
+    stock, snap = columns["stock_level"], columns["snap_event_detected"]
+    for i, row in rows:
+        if row[snap] == "True":
+            row[stock] = str(2 * float(row[stock]))
+        yield i, row
+
+
+def validate(rows, columns, rejected):
+    """Drop rows that are malformed, counting them in rejected[0]."""
+    width = len(columns)
+    numeric = [columns["stock_level"], columns["usage_rate_hourly"]]
+    snap = columns["snap_event_detected"]
+    for i, row in rows:
+        try:
+            ok = len(row) == width and row[snap] in ("True", "False")
+            for c in numeric:
+                float(row[c])
+        except (ValueError, IndexError):
+            ok = False
+        if ok:
+            yield i, row
+        else:
+            rejected[0] += 1
+
+
+def clean_chunk(start, rows, columns, start_dt):
+    """Run one chunk through the pipeline. Returns (clean rows, rejected count)."""
+    rejected = [0]
+    stream = enumerate(rows, start)
+    stream = validate(stream, columns, rejected)
+    stream = regrid(stream, columns, start_dt)
+    stream = unhalve(stream, columns)
+    cleaned = [row for _, row in stream]
+    return cleaned, rejected[0]
+
+
+def clean_file(src, dst, chunk_rows=CHUNK_ROWS, workers=1):
+    """
+    Stream src through the cleaning stages into dst, chunk_rows rows at a time.
+
+    With workers > 1 chunks are cleaned in a process pool; at most 2 * workers
+    chunks are in flight, so memory stays bounded whatever the file size.
+    Returns row/reject counts and throughput.
+    """
+    started = time.perf_counter()
+    total, rejected = 0, 0
+    with open(src, newline="") as infile, open(dst, "w", newline="") as outfile:
+        header = next(csv.reader([infile.readline()]), None)
+        if header is None:
+            return {"rows": 0, "rejected": 0, "seconds": 0.0, "rows_per_sec": 0.0, "mb_per_sec": 0.0}
+        columns = {name: i for i, name in enumerate(header)}
+        writer = csv.writer(outfile)
+        writer.writerow(header)
+
+        chunks = read_chunks(infile, chunk_rows)
+        first = next(chunks, None)
+        if first is not None:
+            start_dt = datetime.datetime.fromisoformat(first[1][0][columns["timestamp"]])
+            chunks = itertools.chain([first], chunks)
+
+            def emit(result):
+                nonlocal total, rejected
+                rows, bad = result
+                writer.writerows(rows)
+                total += len(rows)
+                rejected += bad
+
+            if workers <= 1:
+                for start, rows in chunks:
+                    emit(clean_chunk(start, rows, columns, start_dt))
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    pending = deque()
+                    for start, rows in chunks:
+                        pending.append(pool.submit(clean_chunk, start, rows, columns, start_dt))
+                        if len(pending) >= 2 * workers:
+                            emit(pending.popleft().result())
+                    while pending:
+                        emit(pending.popleft().result())
+
+    seconds = time.perf_counter() - started
+    size_mb = os.path.getsize(src) / 1e6
+    return {
+        "rows": total,
+        "rejected": rejected,
+        "seconds": seconds,
+        "rows_per_sec": total / seconds if seconds else 0.0,
+        "mb_per_sec": size_mb / seconds if seconds else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regrid timestamps and undo snap halving in a stock CSV.")
+    parser.add_argument("src", nargs="?", default="../historical_avengers_data.csv")
+    parser.add_argument("dst", nargs="?", default="../cleaned_avengers_data.csv")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=1, help="processes to clean chunks in (0 = all cores)")
+    args = parser.parse_args()
+
+    stats = clean_file(args.src, args.dst, args.chunk_rows, args.workers or os.cpu_count() or 1)
+    print(
+        f"Cleaned {stats['rows']} rows ({stats['rejected']} rejected) in {stats['seconds']:.2f}s: "
+        f"{stats['rows_per_sec']:,.0f} rows/s, {stats['mb_per_sec']:.1f} MB/s"
+    )
@@ -0,0 +1,184 @@
+import csv
+import os
+import sys
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+except ImportError:  # optional; without it load_resource_data parses the CSV directly
+    pa = None
+
+# Parquet datasets live next to their CSV: <csv dir>/parquet/<csv name without .csv>/
+PARQUET_DIR = "parquet"
+
+PARTITION_COLUMNS = ["sector_id", "resource_type"]
+
+if pa is not None:
+    # "row" keeps each reading's position in the source CSV so file order can be restored
+    SCHEMA = pa.schema([
+        ("row", pa.int64()),
+        ("timestamp", pa.timestamp("s")),
+        ("sector_id", pa.string()),
+        ("resource_type", pa.string()),
+        ("stock_level", pa.float64()),
+        ("usage_rate_hourly", pa.float64()),
+        ("snap_event_detected", pa.bool_()),
+    ])
+
+    _PARTITIONING = ds.partitioning(
+        pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS]), flavor="hive"
+    )
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for the Parquet copy of the stock CSV (pip install pyarrow)")
+
+
+def dataset_path(csv_path):
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(os.path.dirname(csv_path) or ".", PARQUET_DIR, name)
+
+
+def convert_csv(csv_path, out_dir=None, block_size=64 << 20):
+    """
+    Convert a stock CSV into a Parquet dataset partitioned by sector and resource.
+
+    The CSV is read in blocks of block_size bytes, so memory stays bounded for
+    large files. Returns the dataset directory.
+    """
+    _require_pyarrow()
+    out_dir = out_dir or dataset_path(csv_path)
+    reader = pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={name: SCHEMA.field(name).type for name in SCHEMA.names if name != "row"}
+        ),
+    )
+
+    def batches():
+        offset = 0
+        for batch in reader:
+            rows = pa.array(np.arange(offset, offset + batch.num_rows, dtype=np.int64))
+            offset += batch.num_rows
+            yield pa.RecordBatch.from_arrays(
+                [rows] + [batch.column(name) for name in SCHEMA.names[1:]], schema=SCHEMA
+            )
+
+    ds.write_dataset(
+        batches(),
+        out_dir,
+        schema=SCHEMA,
+        format="parquet",
+        partitioning=_PARTITIONING,
+        existing_data_behavior="delete_matching",
+    )
+    return out_dir
+
+
+def open_dataset(csv_path):
+    """The Parquet dataset for csv_path, converting the CSV on first use or when it is newer."""
+    _require_pyarrow()
+    path = dataset_path(csv_path)
+    if not os.path.isdir(path) or os.path.getmtime(csv_path) > os.path.getmtime(path):
+        convert_csv(csv_path, path)
+        os.utime(path)
+    return ds.dataset(path, format="parquet", partitioning=_PARTITIONING)
+
+
+def load_table(csv_path, sectors=None, resources=None, columns=None):
+    """
+    Arrow table of the readings for the given sectors/resources (all by default),
+    in source-file order. Partition filters mean only matching files are read.
+    """
+    dataset = open_dataset(csv_path)
+    condition = None
+    for name, values in (("sector_id", sectors), ("resource_type", resources)):
+        if values is not None:
+            term = pc.field(name).isin(list(values))
+            condition = term if condition is None else condition & term
+    wanted = None if columns is None else list(dict.fromkeys(["row", *columns]))
+    table = dataset.to_table(columns=wanted, filter=condition)
+    return table.sort_by("row")
+
+
+def to_numpy(column):
+    """NumPy view of an Arrow column; zero-copy when it is a single null-free chunk."""
+    if isinstance(column, pa.ChunkedArray):
+        column = column.combine_chunks() if column.num_chunks != 1 else column.chunk(0)
+    return column.to_numpy(zero_copy_only=False)
+
+
+def load_columns(csv_path, sectors=None, resources=None, columns=None):
+    """{column name: NumPy array} for the selected readings, in source-file order."""
+    table = load_table(csv_path, sectors, resources, columns)
+    names = columns or [name for name in table.column_names if name != "row"]
+    return {name: to_numpy(table.column(name)) for name in names}
+
+
+def load_resource_data(csv_path, sectors=None, resources=None):
+    """
+    sector -> resource -> {"timestamp": ISO strings, "stock_level", "usage_rate_hourly",
+    "snap_event_detected": arrays}, the shape collect_data.get_resource_data returns.
+    Read from the Parquet copy when pyarrow is installed, otherwise from the CSV.
+    """
+    if pa is None:
+        return _read_csv_resource_data(csv_path, sectors, resources)
+    table = load_table(csv_path, sectors, resources)
+    data = {}
+    # One group per (sector, resource) partition, visited in order of first appearance
+    keys = (
+        table.group_by(PARTITION_COLUMNS).aggregate([("row", "min")])
+        .sort_by("row_min").select(PARTITION_COLUMNS).to_pylist()
+    )
+    for key in keys:
+        part = table.filter(
+            (pc.field("sector_id") == key["sector_id"]) & (pc.field("resource_type") == key["resource_type"])
+        )
+        timestamps = to_numpy(part.column("timestamp"))
+        data.setdefault(key["sector_id"], {})[key["resource_type"]] = {
+            "timestamp": np.datetime_as_string(timestamps, unit="s"),
+            "stock_level": to_numpy(part.column("stock_level")),
+            "usage_rate_hourly": to_numpy(part.column("usage_rate_hourly")),
+            "snap_event_detected": to_numpy(part.column("snap_event_detected")),
+        }
+    return data
+
+
+def _read_csv_resource_data(csv_path, sectors=None, resources=None):
+    columns = {}
+    with open(csv_path, newline="") as f:
+        for row in csv.DictReader(f):
+            if sectors is not None and row["sector_id"] not in sectors:
+                continue
+            if resources is not None and row["resource_type"] not in resources:
+                continue
+            pair = columns.setdefault(row["sector_id"], {}).setdefault(
+                row["resource_type"], {"timestamp": [], "stock_level": [], "usage_rate_hourly": [], "snap_event_detected": []}
+            )
+            pair["timestamp"].append(row["timestamp"])
+            pair["stock_level"].append(float(row["stock_level"]))
+            pair["usage_rate_hourly"].append(float(row["usage_rate_hourly"]))
+            pair["snap_event_detected"].append(row["snap_event_detected"] == "True")
+    return {
+        sector: {
+            resource: {
+                "timestamp": np.datetime_as_string(np.array(pair["timestamp"], dtype="datetime64[s]"), unit="s"),
+                "stock_level": np.array(pair["stock_level"]),
+                "usage_rate_hourly": np.array(pair["usage_rate_hourly"]),
+                "snap_event_detected": np.array(pair["snap_event_detected"]),
+            }
+            for resource, pair in pairs.items()
+        }
+        for sector, pairs in columns.items()
+    }
+
+
+if __name__ == "__main__":
+    # python columnar.py ../historical_avengers_data.csv [...]
+    for csv_path in sys.argv[1:]:
+        print(f"{csv_path} -> {convert_csv(csv_path)}")
@@ -2,17 +2,19 @@ import numpy as np
 from collect_data import get_resource_data
 import statsmodels.api as sm
 import matplotlib.pyplot as plt
+from simulation import simulate_paths
 
 def get_stock_data():
-    stock_data = get_resource_data()
     sectors = ["New Asgard", "Sanctum Sanctorum"]
+    stock_data = get_resource_data(sectors=sectors)
     data = []
 
     for sector in sectors:
         for resource in stock_data[sector].keys():
             r_stock_data = stock_data[sector][resource]
-            r_stock_level = [r_stock_data["stock_level"][i] if not r_stock_data["snap_event_detected"][i] else 2 * r_stock_data["stock_level"][i] for i in range(1500)]
-            data.append(r_stock_level)
+            # Undo the snap halving
+            r_stock_level = np.where(r_stock_data["snap_event_detected"], 2, 1) * r_stock_data["stock_level"]
+            data.append(r_stock_level[:1500])
     return data
 
 data = np.array(get_stock_data())
@@ -94,21 +96,9 @@ z_empirical_trimmed = z_empirical[
 ]
 
 # =====================================================
-# 5. SIMULATION FUNCTION
+# 5. SIMULATE PATHS
 # =====================================================
 
-def simulate_paths(N, T, beta0, beta1, sigma, alpha, z_empirical):
-    t = np.arange(1, T + 1)
-    paths = np.zeros((N, T))
-
-    for i in range(N):
-        z = np.random.choice(z_empirical, size=T, replace=True)
-
-        noise = sigma * (t ** (alpha / 2)) * z
-        paths[i] = beta0 + beta1 * t + noise
-
-    return paths
-
 # Generate simulated datasets
 simulated_data = simulate_paths(
     N, T, beta0, beta1, sigma_hat, alpha_hat, z_empirical_trimmed
@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+import numpy as np
+from columnar import load_resource_data
+
+# Array caches live next to their CSV: <csv dir>/npcache/<csv name without .csv>/
+CACHE_DIR = "npcache"
+INDEX_FILE = "index.json"
+
+# Fixed-width dtypes so every column is a flat, memory-mappable .npy
+DTYPES = {
+    "timestamp": "U19",  # ISO "YYYY-MM-DDTHH:MM:SS"
+    "stock_level": np.float64,
+    "usage_rate_hourly": np.float64,
+    "snap_event_detected": np.bool_,
+}
+
+
+def cache_path(csv_path):
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(os.path.dirname(csv_path) or ".", CACHE_DIR, name)
+
+
+def build_cache(csv_path, out_dir=None):
+    """
+    Write one .npy per sector-resource column of csv_path, plus an index of the pairs
+    in file order. The index is written last, so a half-built cache is never used.
+    """
+    out_dir = out_dir or cache_path(csv_path)
+    os.makedirs(out_dir, exist_ok=True)
+    pairs = []
+    for sector, resources in load_resource_data(csv_path).items():
+        for resource, columns in resources.items():
+            stem = f"{len(pairs):03d}"
+            for name, dtype in DTYPES.items():
+                np.save(os.path.join(out_dir, f"{stem}.{name}.npy"), np.ascontiguousarray(columns[name], dtype=dtype))
+            pairs.append({"sector_id": sector, "resource_type": resource, "file": stem, "rows": len(columns["stock_level"])})
+
+    tmp = os.path.join(out_dir, INDEX_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"source": os.path.abspath(csv_path), "pairs": pairs}, f, indent=2)
+    os.replace(tmp, os.path.join(out_dir, INDEX_FILE))
+    return out_dir
+
+
+def open_index(csv_path):
+    """The cache index for csv_path, building the cache on first use or when the CSV is newer."""
+    index_path = os.path.join(cache_path(csv_path), INDEX_FILE)
+    if not os.path.exists(index_path) or os.path.getmtime(csv_path) > os.path.getmtime(index_path):
+        build_cache(csv_path)
+    with open(index_path) as f:
+        return json.load(f)
+
+
+def load_series(csv_path, sectors=None, resources=None):
+    """
+    sector -> resource -> {column: read-only memory-mapped array}, the shape
+    collect_data.get_resource_data returns. Processes opening the same cache
+    share one page-cache copy, and nothing is parsed beyond the index.
+    """
+    directory = cache_path(csv_path)
+    data = {}
+    for pair in open_index(csv_path)["pairs"]:
+        if sectors is not None and pair["sector_id"] not in sectors:
+            continue
+        if resources is not None and pair["resource_type"] not in resources:
+            continue
+        data.setdefault(pair["sector_id"], {})[pair["resource_type"]] = {
+            name: np.load(os.path.join(directory, f"{pair['file']}.{name}.npy"), mmap_mode="r")
+            for name in DTYPES
+        }
+    return data
+
+
+if __name__ == "__main__":
+    # python series_cache.py ../historical_avengers_data.csv [...]
+    for csv_path in sys.argv[1:]:
+        print(f"{csv_path} -> {build_cache(csv_path)}")
@@ -0,0 +1,73 @@
+import numpy as np
+
+# Paths generated per chunk; a (chunk, T) float64 block is chunk * T * 8 bytes
+CHUNK_PATHS = 10_000
+
+
+def simulate_paths(N, T, start_levels, beta1, sigma, alpha, z_empirical=None, rng=None):
+    """
+    Simulate N stock paths of length T in one vectorized draw:
+
+        path[i, t] = start_levels[i] + beta1 * t + sigma * t^(alpha/2) * z[i, t],  t = 1..T
+
+    start_levels is a scalar or one value per path. z is standard normal, or
+    resampled with replacement from z_empirical when given. rng is a
+    np.random.Generator or a seed for one.
+    """
+    rng = np.random.default_rng(rng)
+    t = np.arange(1, T + 1)
+    if z_empirical is None:
+        paths = rng.standard_normal((N, T))
+    else:
+        paths = rng.choice(np.asarray(z_empirical, dtype=float), size=(N, T), replace=True)
+    # Scale and shift in place so the (N, T) draw is the only large allocation
+    paths *= sigma * t ** (alpha / 2)
+    paths += beta1 * t
+    paths += np.broadcast_to(np.asarray(start_levels, dtype=float), (N,))[:, None]
+    return paths
+
+
+def simulate_chunks(n_paths, T, start_level, beta1, sigma, alpha, z_empirical=None, seed=0, chunk_paths=CHUNK_PATHS):
+    """
+    Yield simulate_paths blocks of at most chunk_paths paths until n_paths are produced.
+
+    Each chunk draws from its own stream spawned from `seed`, so results are
+    reproducible and chunks can be generated in any order or in parallel.
+    """
+    n_chunks = -(-n_paths // chunk_paths)
+    streams = np.random.SeedSequence(seed).spawn(n_chunks)
+    for c, stream in enumerate(streams):
+        n = min(chunk_paths, n_paths - c * chunk_paths)
+        yield simulate_paths(n, T, start_level, beta1, sigma, alpha, z_empirical, np.random.default_rng(stream))
+
+
+def stockout_stress_test(n_paths, T, start_level, beta1, sigma, alpha, z_empirical=None, seed=0, chunk_paths=CHUNK_PATHS):
+    """
+    Run n_paths scenarios for one resource and summarize when stock first hits zero.
+
+    Memory stays at one chunk regardless of n_paths. Returns the probability of
+    a stockout within T steps, the cumulative stockout probability at each step,
+    and the 5th/50th/95th percentile stockout step among paths that run out
+    (None when none do).
+    """
+    first_hits = np.zeros(T, dtype=np.int64)
+    for paths in simulate_chunks(n_paths, T, start_level, beta1, sigma, alpha, z_empirical, seed, chunk_paths):
+        out = paths <= 0
+        hit = out.any(axis=1)
+        first_hits += np.bincount(out[hit].argmax(axis=1), minlength=T)
+
+    hits_so_far = np.cumsum(first_hits)
+    n_hit = int(hits_so_far[-1]) if T else 0
+
+    def step_at(q):
+        if n_hit == 0:
+            return None
+        return int(np.searchsorted(hits_so_far, max(1, int(np.ceil(q * n_hit))))) + 1
+
+    return {
+        "p_stockout": n_hit / n_paths,
+        "cumulative_p_stockout": hits_so_far / n_paths,
+        "stockout_step_p5": step_at(0.05),
+        "stockout_step_p50": step_at(0.5),
+        "stockout_step_p95": step_at(0.95),
+    }
@@ -1,20 +1,37 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import Body, FastAPI, Depends, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy import func, desc
-from database import create_db, get_session
-from models import Hero, Sector, Resource, SectorResource, ResourceStockLevel, Report, Priority, User, UserSession
+from sqlalchemy.exc import IntegrityError
+from database import create_db, get_session, get_async_session, engine, async_engine
+from models import Hero, Sector, Resource, SectorResource, ResourceStockLevel, Report, ReportRedaction, Priority, User, UserSession
 from jarvis import Jarvis, ResourceDetector, HeroDetector, openai_client
 from config import Config
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime, timedelta
-import uuid, base64, json
-from regression import Regression
-
-from redact_report import redact_reports
+import asyncio, uuid, base64, json, logging
+from regression import fit_window
+from rollups import ROLLUP_BUCKETS, ensure_rollups, record_stock_level, pick_bucket, fetch_date_bounds, fetch_pair_stats, fetch_resource_buckets
+
+from downsample import downsample_aligned, downsample_rows
+from executor import JobExecutor, JobTimeout
+from regression_cache import RegressionCache, cache_key
+from live_regression import LiveRegressions
+from forecasts import TS_FORMAT, stale_forecasts, save_forecast, days_remaining, fetch_forecasts, forecasts_query, resource_days_remaining
+from ingest import ingest_text
+from redact_report import set_known_aliases
+from report_index import ReportIndex, RECENT_REPORT_DAYS, URGENT_REPORT_DAYS, report_row
+from report_redaction import redaction_for, redact_stale_reports
+from response_cache import CATALOG, ResponseCache, cache_key as jarvis_cache_key
+
+logger = logging.getLogger(__name__)
 
 jarvis = Jarvis()
+report_index = ReportIndex()
+jarvis_cache = ResponseCache(max_entries=Config.JARVIS_CACHE_SIZE, ttl=Config.JARVIS_CACHE_TTL)
 
 class Message(BaseModel):
     role: str
@@ -35,6 +52,26 @@ app.add_middleware(
 @app.on_event("startup")
 def on_startup():
     create_db()
+    with Session(engine) as session:
+        ensure_rollups(session)
+        live_fits.load(fetch_regression_windows(session, list(session.exec(select(SectorResource.id)).all())))
+        set_known_aliases(session.exec(select(Hero.alias)).all())
+        refresh_redactions(session)
+
+
+def refresh_redactions(session: Session) -> None:
+    """Bring stored report redactions up to the current alias set and reload the report index from them."""
+    redact_stale_reports(session)
+    report_index.load(session.exec(
+        select(Report, Hero, ReportRedaction)
+        .join(Hero, Report.hero_id == Hero.id)
+        .outerjoin(ReportRedaction, ReportRedaction.report_id == Report.id)
+        .where(Report.timestamp >= datetime.now() - timedelta(days=URGENT_REPORT_DAYS))
+    ).all())
+
+def _refresh_redactions() -> None:
+    with Session(engine) as session:
+        refresh_redactions(session)
 
 
 def decode_google_jwt(token: str) -> dict:
@@ -97,28 +134,81 @@ def logout(body: LogoutRequest, db: Session = Depends(get_session)):
 # --- Jarvis ---
 
 @app.post("/ask_jarvis")
-async def ask_jarvis(body: AskJarvisRequest, db: Session = Depends(get_session)):
-    resources = db.exec(select(Resource)).all()
-    heroes = db.exec(select(Hero)).all()
-    reports = fetch_recent_reports(db)
+async def ask_jarvis(
+    body: AskJarvisRequest,
+    stream: bool = Query(False, description="Stream the reply as Server-Sent Events"),
+    db: AsyncSession = Depends(get_async_session),
+):
+    message_dicts = [m.model_dump() for m in body.messageList]
+    key = jarvis_cache_key(message_dicts)
+    cached = jarvis_cache.get(key)
+    if cached is not None:
+        if stream:
+            return jarvis_stream_response(replay_jarvis(cached))
+        return cached
+
+    resources = (await db.exec(select(Resource))).all()
+    heroes = (await db.exec(select(Hero))).all()
+    jarvis_cache.observe_catalog((r.resource_name for r in resources), (h.alias for h in heroes))
+    if set_known_aliases(h.alias for h in heroes):
+        # The hero list changed, so stored redactions are out of date
+        await asyncio.to_thread(_refresh_redactions)
+    forecast_days = resource_days_remaining((await db.exec(forecasts_query())).all())
     last_message = body.messageList[-1].content if body.messageList else ""
     detectors = [
         ResourceDetector(
             resource_names=[r.resource_name for r in resources],
-            reports=reports,
+            reports=report_index,
             last_message=last_message,
+            days_remaining=forecast_days,
         ),
         HeroDetector(
             hero_aliases=[h.alias for h in heroes],
-            reports=reports,
+            reports=report_index,
             last_message=last_message,
         ),
     ]
 
-    message_dicts = [m.model_dump() for m in body.messageList]
+    # Versions before generating, so data written meanwhile invalidates this reply
+    stamp = jarvis_cache.stamp(k for d in detectors for k in d.cache_keys())
+    if stream:
+        events = jarvis.stream_jarvis(messageList=message_dicts, detectors=detectors)
+        return jarvis_stream_response(cache_jarvis_events(events, key, stamp))
     response = await jarvis.ask_jarvis(messageList=message_dicts, detectors=detectors)
+    jarvis_cache.put(key, stamp, response)
     return response
 
+def jarvis_stream_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        jarvis_events(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def cache_jarvis_events(events, key, stamp):
+    async for event, data in events:
+        if event == "done":
+            jarvis_cache.put(key, stamp, data)
+        yield event, data
+
+async def replay_jarvis(result: dict):
+    """A cached reply in stream_jarvis's event shape: the whole response as one token."""
+    yield "token", result.get("response", "")
+    yield "done", result
+
+async def jarvis_events(events):
+    """
+    SSE framing for Jarvis.stream_jarvis: "token" events carry {"text"} as the
+    reply is generated, then one "done" event with the full ask_jarvis result,
+    or an "error" event if generation fails.
+    """
+    try:
+        async for event, data in events:
+            payload = {"text": data} if event == "token" else data
+            yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
 
 # --- Heroes ---
 
@@ -137,6 +227,7 @@ def get_hero(hero_id: int, session: Session = Depends(get_session)):
 def create_hero(hero: Hero, session: Session = Depends(get_session)):
     session.add(hero)
     session.commit()
+    jarvis_cache.bump(CATALOG)
     session.refresh(hero)
     return hero
 
@@ -165,6 +256,7 @@ def get_resources(session: Session = Depends(get_session)):
 def create_resource(resource: Resource, session: Session = Depends(get_session)):
     session.add(resource)
     session.commit()
+    jarvis_cache.bump(CATALOG)
     session.refresh(resource)
     return resource
 
@@ -183,11 +275,47 @@ def get_stock_levels_for_sector_resource(sector_resource_id: int, session: Sessi
 
 @app.post("/stock-levels")
 def create_stock_level(stock_level: ResourceStockLevel, session: Session = Depends(get_session)):
-    session.add(stock_level)
-    session.commit()
+    try:
+        session.add(stock_level)
+        record_stock_level(session, stock_level)
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(status_code=409, detail="A stock level for this sector-resource and timestamp already exists")
+    regression_cache.invalidate(stock_level.sector_resource_id)
+    invalidate_jarvis_resources(session, [stock_level.sector_resource_id])
+    refresh_live_fit(session, stock_level)
+    request_forecast_refresh()
     session.refresh(stock_level)
     return stock_level
 
+@app.post("/stock-levels/ingest")
+def ingest_stock_levels(body: bytes = Body(..., media_type="text/csv"), session: Session = Depends(get_session)):
+    """Append a CSV drop, skipping rows at or before each pair's latest stored timestamp."""
+    try:
+        stats = ingest_text(session, body.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV: {e}")
+    for sr_id in stats["sector_resource_ids"]:
+        regression_cache.invalidate(sr_id)
+    invalidate_jarvis_resources(session, stats["sector_resource_ids"])
+    live_fits.load(fetch_regression_windows(session, stats["sector_resource_ids"]))
+    if stats["inserted"]:
+        request_forecast_refresh()
+    return stats
+
+
+def invalidate_jarvis_resources(session: Session, sector_resource_ids: List[int]) -> None:
+    """Drop cached Jarvis replies about the resources of these sector-resources."""
+    if not sector_resource_ids:
+        return
+    names = session.exec(
+        select(Resource.resource_name)
+        .join(SectorResource, SectorResource.resource_id == Resource.id)
+        .where(SectorResource.id.in_(sector_resource_ids))
+    ).all()
+    jarvis_cache.bump(*(("resource", name) for name in set(names)))
+
 
 # --- Reports ---
 
@@ -218,11 +346,9 @@ class CreateReportRequest(BaseModel):
     priority: int
 
 @app.post("/reports")
-async def create_report(body: CreateReportRequest, session: Session = Depends(get_session)):
-    # Convert ORM objects to plain dicts before the await — SQLAlchemy expires
-    # ORM objects after async suspension, causing their attributes to read as None.
-    sector_data = [{"id": s.id, "name": s.sector_name} for s in session.exec(select(Sector)).all()]
-    resource_data = [{"id": r.id, "name": r.resource_name} for r in session.exec(select(Resource)).all()]
+async def create_report(body: CreateReportRequest, session: AsyncSession = Depends(get_async_session)):
+    sector_data = [{"id": s.id, "name": s.sector_name} for s in (await session.exec(select(Sector))).all()]
+    resource_data = [{"id": r.id, "name": r.resource_name} for r in (await session.exec(select(Resource))).all()]
 
     sector_names = [s["name"] for s in sector_data]
     resource_names = [r["name"] for r in resource_data]
@@ -259,9 +385,24 @@ async def create_report(body: CreateReportRequest, session: Session = Depends(ge
         sector_id=matched_sector["id"],
         resource_id=matched_resource["id"],
     )
+    hero = await session.get(Hero, body.hero_id)
     session.add(report)
-    session.commit()
-    session.refresh(report)
+    await session.flush()
+    # Redact on write so readers never have to
+    redaction = redaction_for(report, hero)
+    session.add(redaction)
+    await session.commit()
+    await session.refresh(report)
+    if hero:
+        report_index.add(report, hero, redaction)
+        # Cached Jarvis replies this report could appear in: recent-report summaries, the
+        # filing hero's reports, and searches for resources its text names
+        text = redaction.redacted_text.lower()
+        jarvis_cache.bump(
+            ("recent",),
+            ("hero", hero.alias.strip().lower()),
+            *(("resource", name) for name in resource_names if name.lower() in text),
+        )
     return {
         "id": report.id,
         "sector": matched_sector["name"],
@@ -279,24 +420,29 @@ def fetch_recent_reports(session: Session) -> list[dict]:
       - High / AvengersLevelThreat reports from the last 30 days
     Deduped and sorted newest-first.
     """
+    recent_query, urgent_query = _recent_report_queries()
+    return _recent_report_rows(session.exec(recent_query).all(), session.exec(urgent_query).all())
+
+def _recent_report_queries():
     now = datetime.now()
-    cutoff_50d  = now - timedelta(days=50)
-    cutoff_100d = now - timedelta(days=100)
+    cutoff_50d  = now - timedelta(days=RECENT_REPORT_DAYS)
+    cutoff_100d = now - timedelta(days=URGENT_REPORT_DAYS)
 
-    recent_any = session.exec(
+    recent_any = (
         select(Report, Hero)
         .join(Hero, Report.hero_id == Hero.id)
         .where(Report.timestamp >= cutoff_50d)
-    ).all()
-    recent_any = sorted(recent_any, key=lambda row: row[0].timestamp, reverse=True)                                                                                                                                
-    urgent_30d = session.exec(
+    )
+    urgent_30d = (
         select(Report, Hero)
         .join(Hero, Report.hero_id == Hero.id)
         .where(Report.timestamp >= cutoff_100d)
         .where(Report.priority >= Priority.High)
-    ).all()
+    )
+    return recent_any, urgent_30d
 
-    priority_names = {0: "Routine", 1: "High", 2: "Avengers Level Threat"}
+def _recent_report_rows(recent_any, urgent_30d) -> list[dict]:
+    recent_any = sorted(recent_any, key=lambda row: row[0].timestamp, reverse=True)
 
     seen = set()
     results = []
@@ -304,13 +450,7 @@ def fetch_recent_reports(session: Session) -> list[dict]:
         if report.id in seen:
             continue
         seen.add(report.id)
-        results.append({
-            "id": report.id,
-            "heroAlias": hero.alias,
-            "timestamp": report.timestamp.isoformat(),
-            "priority": priority_names.get(report.priority, "Routine"),
-            "rawText": report.raw_text,
-        })
+        results.append(report_row(report, hero))
 
     results.sort(key=lambda r: r["timestamp"], reverse=True)
     return results
@@ -318,11 +458,17 @@ def fetch_recent_reports(session: Session) -> list[dict]:
 
 # --- Dashboard ---
 
+CHART_POINTS = 50
+HISTORY_POINTS = 24
+
 @app.get("/api/dashboard")
 def get_dashboard(
     session: Session = Depends(get_session),
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    points: int = Query(CHART_POINTS, ge=3, le=5000),
+    history_points: int = Query(HISTORY_POINTS, ge=3, le=1000),
+    downsample: Literal["lttb", "minmax"] = "lttb",
 ):
     date_filtered = start_date is not None or end_date is not None
     start_dt = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
@@ -337,37 +483,46 @@ def get_dashboard(
     sector_resources = session.exec(select(SectorResource)).all()
     sr_to_resource = {sr.id: resource_map.get(sr.resource_id, "Unknown") for sr in sector_resources}
 
-    # Get latest stock level and average usage per resource (within date range)
-    resource_stats = {}   
+    # Date bounds come from the daily rollups; the chart granularity is the coarsest
+    # rollup bucket that still gives `points` buckets across the requested range
+    first_day, last_day = fetch_date_bounds(session)
+    range_start = start_dt or first_day
+    range_end = end_dt or (last_day + timedelta(days=1) if last_day else None)
+    minutes = pick_bucket(range_start, range_end, points) if range_start and range_end else ROLLUP_BUCKETS[0]
+
+    # Latest stock level and average usage per sector-resource (within date range)
+    pair_stats = fetch_pair_stats(session, start_dt, end_dt)
+
+    # Per-bucket stock/usage sums per resource (within date range); feeds both card history and charts
+    bucket_rows = [
+        (bucket.strftime("%Y-%m-%d %H:%M"), resource_id, stock_sum, usage_sum, n)
+        for bucket, resource_id, stock_sum, usage_sum, n in fetch_resource_buckets(session, minutes, start_dt, end_dt)
+    ]
+
+    resource_stats = {}
     for sr in sector_resources:
-        rname = sr_to_resource[sr.id]
-        levels_query = (
-            select(ResourceStockLevel)
-            .where(ResourceStockLevel.sector_resource_id == sr.id)
-            .order_by(desc(ResourceStockLevel.timestamp))
-        )
-        if start_dt:
-            levels_query = levels_query.where(ResourceStockLevel.timestamp >= start_dt)
-        if end_dt:
-            levels_query = levels_query.where(ResourceStockLevel.timestamp <= end_dt)
-        levels = session.exec(levels_query).all()
-        if not levels:
+        if sr.id not in pair_stats:
             continue
-        latest_stock = levels[0].stock_level
-        avg_usage = sum(l.usage for l in levels) / len(levels) if levels else 0
+        rname = sr_to_resource[sr.id]
+        latest_stock, avg_usage = pair_stats[sr.id]
         if rname not in resource_stats:
             resource_stats[rname] = {"stockLevel": 0, "usage": 0, "count": 0, "history_by_ts": {}}
         resource_stats[rname]["stockLevel"] += latest_stock
         resource_stats[rname]["usage"] += avg_usage
         resource_stats[rname]["count"] += 1
         resource_stats[rname]["id"] = sr.id
-        for level in reversed(levels):  # chronological order
-            ts = level.timestamp.strftime("%Y-%m-%d %H:%M")
-            h = resource_stats[rname]["history_by_ts"]
-            if ts not in h:
-                h[ts] = {"sum": 0, "n": 0}
-            h[ts]["sum"] += level.stock_level
-            h[ts]["n"] += 1
+
+    for ts, resource_id, stock_sum, _, n in bucket_rows:
+        if resource_id is None:
+            continue
+        stats = resource_stats.get(resource_map.get(resource_id, "Unknown"))
+        if stats is None:
+            continue
+        h = stats["history_by_ts"]
+        if ts not in h:
+            h[ts] = {"sum": 0, "n": 0}
+        h[ts]["sum"] += stock_sum
+        h[ts]["n"] += n
 
     # Build resource list
     resource_list = []
@@ -380,9 +535,7 @@ def get_dashboard(
             {"timestamp": ts, "stockLevel": round(v["sum"] / v["n"], 1)}
             for ts, v in history_raw
         ]
-        if len(history) > 24:
-            step = max(1, len(history) // 24)
-            history = history[::step]
+        history = downsample_rows(history, ["stockLevel"], history_points, downsample)
 
         pct_change = None
         if len(history) >= 2:
@@ -400,7 +553,11 @@ def get_dashboard(
             "pctChange": pct_change,
         })
 
-    days_remaining = 5
+    # Soonest forecast stockout across all resources; None until the scheduler has fitted any
+    forecast_days = resource_days_remaining(fetch_forecasts(session))
+    for item in resource_list:
+        item["daysRemaining"] = forecast_days.get(item["name"])
+    soonest_days = min(forecast_days.values(), default=None)
 
     # Get 5 most recent reports with hero alias (within date range)
     reports_query = (
@@ -425,27 +582,19 @@ def get_dashboard(
         for report, hero in report_rows
     ]
 
-    # Build chart time series data (within date range)
-    all_levels_query = select(ResourceStockLevel).order_by(ResourceStockLevel.timestamp)
-    if start_dt:
-        all_levels_query = all_levels_query.where(ResourceStockLevel.timestamp >= start_dt)
-    if end_dt:
-        all_levels_query = all_levels_query.where(ResourceStockLevel.timestamp <= end_dt)
-    all_levels = session.exec(all_levels_query).all()
-
+    # Build chart time series data (within date range) from the rollup buckets
     usage_by_ts = {}
     stock_by_ts = {}
     count_by_ts = {}
-    for level in all_levels:
-        rname = sr_to_resource.get(level.sector_resource_id, "Unknown")
-        ts = level.timestamp.strftime("%Y-%m-%d %H:%M")
+    for ts, resource_id, stock_sum, usage_sum, n in bucket_rows:
+        rname = resource_map.get(resource_id, "Unknown")
         if ts not in usage_by_ts:
             usage_by_ts[ts] = {"timestamp": ts}
             stock_by_ts[ts] = {"timestamp": ts}
             count_by_ts[ts] = {}
-        usage_by_ts[ts][rname] = usage_by_ts[ts].get(rname, 0) + level.usage
-        stock_by_ts[ts][rname] = stock_by_ts[ts].get(rname, 0) + level.stock_level
-        count_by_ts[ts][rname] = count_by_ts[ts].get(rname, 0) + 1
+        usage_by_ts[ts][rname] = usage_by_ts[ts].get(rname, 0) + usage_sum
+        stock_by_ts[ts][rname] = stock_by_ts[ts].get(rname, 0) + stock_sum
+        count_by_ts[ts][rname] = count_by_ts[ts].get(rname, 0) + n
 
     # Average across sectors for same resource at same timestamp
     for ts in usage_by_ts:
@@ -455,27 +604,20 @@ def get_dashboard(
                 usage_by_ts[ts][rname] /= n
                 stock_by_ts[ts][rname] /= n
 
-    # Compute overall min/max dates from all stock levels (unfiltered)
-    all_timestamps = session.exec(select(ResourceStockLevel.timestamp)).all()
-    if all_timestamps:
-        min_date = min(all_timestamps).strftime("%Y-%m-%d")
-        max_date = max(all_timestamps).strftime("%Y-%m-%d")
-    else:
-        min_date = None
-        max_date = None
+    # Overall min/max dates across all stock levels (unfiltered)
+    min_date = first_day.strftime("%Y-%m-%d") if first_day else None
+    max_date = last_day.strftime("%Y-%m-%d") if last_day else None
 
     categories = list(resource_map.values())
 
-    usage_data = list(usage_by_ts.values())
-    stock_data = list(stock_by_ts.values())
-    if len(usage_data) > 50:
-        step = len(usage_data) // 50
-        usage_data = usage_data[::step]
-        stock_data = stock_data[::step]
+    # Both charts are keyed by the same timestamps, so thin them together to keep their x points aligned
+    usage_data, stock_data = downsample_aligned(
+        [list(usage_by_ts.values()), list(stock_by_ts.values())], categories, points, downsample
+    )
 
     return {
         "resourceCount": resource_count,
-        "daysRemaining": days_remaining,
+        "daysRemaining": soonest_days,
         "resources": resource_list[:5],
         "reports": report_list,
         "minDate": min_date,
@@ -526,47 +668,201 @@ def get_dashboard_reports(
     ]
 
 # --- Regression ---
-@app.get("/api/regression/{sector_resource_id}")
-async def run_regression(sector_resource_id: int, session: Session = Depends(get_session)):
-    # Get last 20 stock level entries for this resource
-    q = (
-        session.query(ResourceStockLevel)
-        .filter(ResourceStockLevel.sector_resource_id == sector_resource_id)
-        .order_by(ResourceStockLevel.timestamp.desc())
-        .limit(200)
+
+REGRESSION_WINDOW = 200
+
+jobs = JobExecutor(kind=Config.JOB_EXECUTOR, max_workers=Config.JOB_WORKERS, timeout=Config.JOB_TIMEOUT)
+live_fits = LiveRegressions(REGRESSION_WINDOW)
+regression_cache = RegressionCache(
+    max_entries=Config.REGRESSION_CACHE_SIZE,
+    bind=engine if Config.REGRESSION_CACHE_PERSIST else None,
+)
+
+@app.on_event("shutdown")
+def on_shutdown():
+    jobs.shutdown()
+
+@app.get("/api/jobs/metrics")
+def get_job_metrics():
+    return {**jobs.metrics(), "regression_cache": regression_cache.stats(), "jarvis_cache": jarvis_cache.stats()}
+
+async def fit_cached(sector_resource_id: int, rows: list) -> dict:
+    """fit_window payload for a window, from the cache or the job executor. Raises JobTimeout."""
+    key = cache_key(sector_resource_id, rows)
+    cached = await asyncio.to_thread(regression_cache.get, key)
+    if cached is not None:
+        return cached
+
+    timestamps, stock_levels, snap_flags = map(list, zip(*rows))
+    payload = await jobs.run(fit_window, timestamps, stock_levels, snap_flags)
+    await asyncio.to_thread(regression_cache.put, key, payload)
+    return payload
+
+async def run_fit(sector_resource_id: int, rows: list) -> dict:
+    try:
+        return await fit_cached(sector_resource_id, rows)
+    except JobTimeout as e:
+        raise HTTPException(status_code=504, detail=f"Regression timed out: {e}")
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
+
+
+def fetch_regression_windows(session: Session, sector_resource_ids: List[int]) -> dict[int, list]:
+    """Latest REGRESSION_WINDOW stock rows per sector-resource, oldest first, in one windowed query."""
+    rows = session.exec(_regression_windows_query(sector_resource_ids)).all()
+    return _group_windows(rows, sector_resource_ids)
+
+async def fetch_regression_windows_async(session: AsyncSession, sector_resource_ids: List[int]) -> dict[int, list]:
+    """fetch_regression_windows on an async session."""
+    rows = (await session.exec(_regression_windows_query(sector_resource_ids))).all()
+    return _group_windows(rows, sector_resource_ids)
+
+def _regression_windows_query(sector_resource_ids: List[int]):
+    ranked = (
+        select(
+            ResourceStockLevel.sector_resource_id,
+            ResourceStockLevel.timestamp,
+            ResourceStockLevel.stock_level,
+            ResourceStockLevel.snap_event,
+            func.row_number().over(
+                partition_by=ResourceStockLevel.sector_resource_id,
+                order_by=desc(ResourceStockLevel.timestamp),
+            ).label("rn"),
+        )
+        .where(ResourceStockLevel.sector_resource_id.in_(sector_resource_ids))
+        .subquery()
     )
-    rows = list(q)[::-1] 
-    if len(rows) < 2:
-        raise HTTPException(status_code=404, detail="Not enough data for regression.")
+    return (
+        select(ranked.c.sector_resource_id, ranked.c.timestamp, ranked.c.stock_level, ranked.c.snap_event)
+        .where(ranked.c.rn <= REGRESSION_WINDOW)
+        .order_by(ranked.c.sector_resource_id, desc(ranked.c.rn))
+    )
+
+def _group_windows(rows, sector_resource_ids: List[int]) -> dict[int, list]:
+    windows = {sr_id: [] for sr_id in sector_resource_ids}
+    for sr_id, timestamp, stock_level, snap_event in rows:
+        windows[sr_id].append((timestamp, stock_level, snap_event))
+    return windows
+
+
+def refresh_live_fit(session: Session, level: ResourceStockLevel):
+    """Slide the pair's live fit forward, or reload it when the row lands inside the window."""
+    if not live_fits.observe(level.sector_resource_id, level.timestamp, level.stock_level, level.snap_event):
+        live_fits.load(fetch_regression_windows(session, [level.sector_resource_id]))
+
 
-    stock_levels = [row.stock_level for row in rows]
-    t_0 = rows[0].timestamp
-    snap_indexes = [i for i, row in enumerate(rows) if row.snap_event]
+@app.get("/api/regression/live")
+def get_live_regressions():
+    """Point estimates (no bootstrap interval) kept current as stock rows arrive, keyed by sector-resource id."""
+    return live_fits.estimates()
 
-    t_snap = snap_indexes[0] if snap_indexes else None
-    print(t_snap)
-    reg = Regression(stock_levels, t_0, t_snap)
-    reg.fit()
-    result = reg.get_result_dict()
-    line = reg.get_line()
-    ci = reg.get_confidence_interval()
 
-    def idx_to_ts(idx):
-        if idx is None:
-            return None
-        return (t_0 + timedelta(minutes=int(12 * float(idx)))).strftime("%Y-%m-%d %H:%M")
+@app.get("/api/regression/batch")
+async def run_regression_batch(
+    ids: Optional[List[int]] = Query(None),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Regression payloads for many sector-resources (all of them by default), keyed by id.
+
+    Ids without enough data map to null. Fits run in parallel on the job executor.
+    """
+    sector_resource_ids = ids or list((await session.exec(select(SectorResource.id))).all())
+    windows = await fetch_regression_windows_async(session, sector_resource_ids)
 
-    t_star_ts = idx_to_ts(result.get("t_star")) if result else None
-    ci_lo_ts = idx_to_ts(ci.get("ci_lo")) if ci and ci.get("OK") else None
-    ci_hi_ts = idx_to_ts(ci.get("ci_hi")) if ci and ci.get("OK") else None
+    fittable = [sr_id for sr_id, rows in windows.items() if len(rows) >= 2]
+    payloads = await asyncio.gather(*(run_fit(sr_id, windows[sr_id]) for sr_id in fittable))
+
+    results = {sr_id: None for sr_id in sector_resource_ids}
+    results.update(zip(fittable, payloads))
+    return results
 
+
+@app.get("/api/regression/{sector_resource_id}")
+async def run_regression(sector_resource_id: int, session: AsyncSession = Depends(get_async_session)):
+    rows = (await fetch_regression_windows_async(session, [sector_resource_id]))[sector_resource_id]
+    if len(rows) < 2:
+        raise HTTPException(status_code=404, detail="Not enough data for regression.")
+
+    return await run_fit(sector_resource_id, rows)
+
+
+# --- Forecasts ---
+
+_forecast_loop: Optional[asyncio.AbstractEventLoop] = None
+_forecast_wakeup: Optional[asyncio.Event] = None
+_forecast_task: Optional[asyncio.Task] = None
+
+def request_forecast_refresh():
+    """Wake the forecast scheduler after stock data changes. Safe to call from worker threads."""
+    if _forecast_loop is not None:
+        _forecast_loop.call_soon_threadsafe(_forecast_wakeup.set)
+
+def _load_stale_windows() -> tuple[dict, dict]:
+    with Session(engine) as session:
+        versions = stale_forecasts(session)
+        return versions, fetch_regression_windows(session, list(versions))
+
+def _save_forecasts(versions: dict, payloads: dict):
+    with Session(engine) as session:
+        for sr_id, payload in payloads.items():
+            save_forecast(session, sr_id, payload, versions[sr_id])
+        session.commit()
+        invalidate_jarvis_resources(session, list(payloads))
+
+async def refresh_forecasts() -> int:
+    """Refit every pair whose stock data changed since its stored forecast. Returns pairs written."""
+    versions, windows = await asyncio.to_thread(_load_stale_windows)
+    payloads = {}
+    for sr_id, rows in windows.items():
+        try:
+            payloads[sr_id] = await fit_cached(sr_id, rows) if len(rows) >= 2 else None
+        except Exception:
+            # Retried on the next pass, since its forecast is still stale
+            logger.exception("Forecast fit failed for sector-resource %s", sr_id)
+    await asyncio.to_thread(_save_forecasts, versions, payloads)
+    return len(payloads)
+
+async def forecast_scheduler():
+    while True:
+        try:
+            await refresh_forecasts()
+        except Exception:
+            logger.exception("Forecast refresh failed")
+        try:
+            await asyncio.wait_for(_forecast_wakeup.wait(), Config.FORECAST_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _forecast_wakeup.clear()
+
+@app.on_event("startup")
+async def start_forecast_scheduler():
+    global _forecast_loop, _forecast_wakeup, _forecast_task
+    _forecast_loop = asyncio.get_running_loop()
+    _forecast_wakeup = asyncio.Event()
+    _forecast_task = asyncio.create_task(forecast_scheduler())
+
+@app.on_event("shutdown")
+async def stop_forecast_scheduler():
+    global _forecast_loop
+    _forecast_loop = None
+    if _forecast_task is not None:
+        _forecast_task.cancel()
+
+@app.get("/api/forecasts")
+def get_forecasts(session: Session = Depends(get_session)):
+    """Stored stockout forecasts keyed by sector-resource id."""
     return {
-        "result": result,
-        "line": line,
-        "snap_indexes": snap_indexes,
-        "t_0": t_0.isoformat(),
-        "ci": ci,
-        "t_star_ts": t_star_ts,
-        "ci_lo_ts": ci_lo_ts,
-        "ci_hi_ts": ci_hi_ts,
-    }
\ No newline at end of file
+        forecast.sector_resource_id: {
+            "sector": sector_name,
+            "resource": resource_name,
+            "t_star": forecast.t_star,
+            "t_star_ts": forecast.t_star_ts.strftime(TS_FORMAT) if forecast.t_star_ts else None,
+            "ci_lo_ts": forecast.ci_lo_ts.strftime(TS_FORMAT) if forecast.ci_lo_ts else None,
+            "ci_hi_ts": forecast.ci_hi_ts.strftime(TS_FORMAT) if forecast.ci_hi_ts else None,
+            "daysRemaining": days_remaining(forecast),
+            "fittedAt": forecast.fitted_at.isoformat(),
+        }
+        for forecast, sector_name, resource_name in fetch_forecasts(session)
+    }
@@ -9,3 +9,20 @@ class Config:
     
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     MODEL = "gpt-4o-mini"
+    DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./jarvis.db')
+    # Derived from DATABASE_URL (aiosqlite / asyncpg) unless set explicitly
+    ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL')
+    # Executor for regression fits and other CPU-bound jobs: "process" (falls back to threads) or "thread"
+    JOB_EXECUTOR = os.getenv('JOB_EXECUTOR', 'process')
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '0')) or None
+    JOB_TIMEOUT = float(os.getenv('JOB_TIMEOUT', '30'))
+    REGRESSION_CACHE_SIZE = int(os.getenv('REGRESSION_CACHE_SIZE', '256'))
+    # Also keep cached regression payloads in the database so they survive restarts
+    REGRESSION_CACHE_PERSIST = os.getenv('REGRESSION_CACHE_PERSIST', '').lower() in ('1', 'true', 'yes')
+    # Seconds between forecast refreshes; new stock data also triggers one
+    FORECAST_INTERVAL = float(os.getenv('FORECAST_INTERVAL', '300'))
+    # Upper bound on Jarvis system prompt tokens; report lines beyond it are dropped, lowest priority and oldest first
+    PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '6000'))
+    # Cached /ask_jarvis replies for repeated questions; entries also drop when the data they used changes
+    JARVIS_CACHE_SIZE = int(os.getenv('JARVIS_CACHE_SIZE', '512'))
+    JARVIS_CACHE_TTL = float(os.getenv('JARVIS_CACHE_TTL', '300'))
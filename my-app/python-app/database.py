@@ -1,11 +1,60 @@
+import logging
+from sqlalchemy import delete, func, inspect, select
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from config import Config
+from models import ResourceStockLevel
+from rollups import rebuild_rollups
 
-DATABASE_URL = "sqlite:///./jarvis.db"
+# Async drivers for the same databases: aiosqlite locally, asyncpg for Postgres deployments
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def async_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
+
+logger = logging.getLogger(__name__)
+
+DATABASE_URL = Config.DATABASE_URL
+ASYNC_DATABASE_URL = Config.ASYNC_DATABASE_URL or async_url(DATABASE_URL)
 engine = create_engine(DATABASE_URL, echo=False)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False)
 
-def create_db():
-    SQLModel.metadata.create_all(engine)
+def create_db(bind=engine):
+    SQLModel.metadata.create_all(bind)
+    if "ix_resourcestocklevel_reading" not in {i["name"] for i in inspect(bind).get_indexes("resourcestocklevel")}:
+        dedupe_stock_readings(bind)
+    # create_all skips tables that already exist, so add indexes declared after a db was created
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+
+def dedupe_stock_readings(bind=engine) -> int:
+    """
+    One-time migration for databases created before readings were unique per
+    (sector_resource_id, timestamp): keep the first row of each reading, then
+    rebuild the rollups that counted the rest. Returns rows removed.
+    """
+    keep = select(func.min(ResourceStockLevel.id)).group_by(
+        ResourceStockLevel.sector_resource_id, ResourceStockLevel.timestamp
+    )
+    with Session(bind) as session:
+        removed = session.execute(delete(ResourceStockLevel).where(ResourceStockLevel.id.not_in(keep))).rowcount
+        session.commit()
+        if removed:
+            logger.warning("Removed %d duplicate stock readings before adding ix_resourcestocklevel_reading", removed)
+            rebuild_rollups(session)
+    return removed
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+async def get_async_session():
+    # Objects stay readable after commit; reloading them would need another await
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
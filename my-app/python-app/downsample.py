@@ -0,0 +1,112 @@
+"""
+Chart downsampling: Largest-Triangle-Three-Buckets and a min/max envelope.
+
+Both work on an (n,) or (n, k) array of series sharing one x axis and return
+the sorted row indices to keep, always including the first and last row.
+Multi-series LTTB scores each candidate by the sum of its triangle areas
+across series, with every series scaled to its own range first so that large
+resources do not drown out small ones. Missing values (NaN) score zero.
+"""
+
+import numpy as np
+
+DOWNSAMPLE_MODES = ("lttb", "minmax")
+
+
+def _as_columns(y: np.ndarray) -> np.ndarray:
+    y = np.asarray(y, dtype=float)
+    return y[:, None] if y.ndim == 1 else y
+
+
+def _normalize(y: np.ndarray) -> np.ndarray:
+    lo = np.fmin.reduce(y, axis=0)
+    span = np.fmax.reduce(y, axis=0) - lo
+    span = np.where(np.isfinite(span) & (span > 0), span, 1.0)
+    return (y - np.nan_to_num(lo)) / span
+
+
+def _column_means(y: np.ndarray) -> np.ndarray:
+    counts = (~np.isnan(y)).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.nansum(y, axis=0) / counts
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Rows picked by Largest-Triangle-Three-Buckets, one per bucket plus both endpoints."""
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    if n_out >= n or n < 3:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])
+    y = _normalize(_as_columns(y))
+
+    # Bucket edges over the interior points; first and last are always kept
+    edges = np.floor(np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(int) + 1
+    edges[-1] = n - 1
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        next_lo, next_hi = hi, edges[b + 2] if b + 2 < len(edges) else n
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = _column_means(y[next_lo:next_hi])
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi, None]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(np.nan_to_num(area).sum(axis=1)))
+        keep[b + 1] = a
+    return keep
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Rows holding each series' minimum and maximum within evenly sized buckets.
+
+    The result never exceeds `n_out` rows: the bucket count allows for every
+    series peaking on a different row, and when `n_out` is too small for even
+    one bucket (under 2k + 2 rows for k series) evenly spaced rows are kept instead.
+    """
+    y = _as_columns(y)
+    n, k = y.shape
+    if n_out >= n or n < 3:
+        return np.arange(n)
+    if n_out < 2 * k + 2:
+        return np.unique(np.round(np.linspace(0, n - 1, max(n_out, 2))).astype(int))
+    n_buckets = max(1, (n_out - 2) // (2 * k))
+    edges = np.linspace(1, n - 1, n_buckets + 1).astype(int)
+    picks = [np.array([0, n - 1])]
+    filled_lo = np.where(np.isnan(y), np.inf, y)
+    filled_hi = np.where(np.isnan(y), -np.inf, y)
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi <= lo:
+            continue
+        picks.append(lo + np.argmin(filled_lo[lo:hi], axis=0))
+        picks.append(lo + np.argmax(filled_hi[lo:hi], axis=0))
+    return np.unique(np.concatenate(picks))
+
+
+def downsample_rows(rows: list[dict], keys: list[str], n_out: int, mode: str = "lttb") -> list[dict]:
+    """Thin a list of {"timestamp": "YYYY-MM-DD HH:MM", key: value, ...} rows to about n_out rows."""
+    return downsample_aligned([rows], keys, n_out, mode)[0]
+
+
+def downsample_aligned(row_lists: list[list[dict]], keys: list[str], n_out: int, mode: str = "lttb") -> list[list[dict]]:
+    """
+    downsample_rows for lists whose rows share timestamps position by position
+    (e.g. the stock and usage charts). The rows to keep are chosen once from
+    every list's series together, so all lists keep the same timestamps.
+    """
+    rows = row_lists[0]
+    if len(rows) <= n_out:
+        return row_lists
+    x = np.array([r["timestamp"] for r in rows], dtype="datetime64[m]").astype(np.int64)
+    y = np.hstack([
+        np.array([[r.get(key, np.nan) for key in keys] for r in series_rows], dtype=float).reshape(len(rows), len(keys))
+        for series_rows in row_lists
+    ])
+    if mode == "minmax":
+        idx = minmax_indices(y, n_out)
+    else:
+        idx = lttb_indices(x, y, n_out)
+    return [[series_rows[i] for i in idx] for series_rows in row_lists]
@@ -0,0 +1,155 @@
+"""
+Finds mentions of known names (resources, hero aliases) in chat messages.
+
+An EntityMatcher is built once per name list. Exact mentions come from a single
+pass of an Aho-Corasick automaton over the message. For fuzzy mentions, each
+message window is scored with difflib only against names that share enough
+space-padded character bigrams with it to possibly reach the threshold and
+that pass difflib's cheap upper bounds, so the full SequenceMatcher ratio runs
+for a handful of candidates instead of every name. Results are memoized per
+message.
+"""
+
+import difflib
+import functools
+import threading
+from collections import Counter, OrderedDict, defaultdict, deque
+from typing import Callable
+
+MATCH_CACHE_SIZE = 1024
+
+# Bigram filter bound. With padding " a " / " b ", each of the M matched characters
+# but one per matching block starts a shared bigram, and each junction between
+# blocks (and each end) is either a shared bigram or an unmatched character. So
+# shared + (len(a) + len(b) - 2M) >= M + 1, and ratio = 2M / (len(a) + len(b)) >= t
+# needs shared >= (1.5t - 1) * (len(a) + len(b)) + 1. Below t = 2/3 that is no
+# constraint beyond "one shared bigram", so every name with the window's token count is scored.
+NGRAM_SAFE_THRESHOLD = 2 / 3
+
+
+def _ngrams(s: str) -> Counter:
+    padded = f" {s} "
+    return Counter(padded[i:i + 2] for i in range(len(padded) - 1))
+
+
+class _Automaton:
+    """Aho-Corasick automaton reporting which patterns occur anywhere in a text."""
+
+    def __init__(self, patterns: list[str]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail = [0]
+        self._out: list[list[int]] = [[]]
+        for idx, pattern in enumerate(patterns):
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[node][ch] = nxt
+                node = nxt
+            self._out[node].append(idx)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def search(self, text: str) -> set[int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set(out[0])
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class EntityMatcher:
+    """
+    Matches normalized names against lowercased messages.
+
+    A name is mentioned if it occurs as a substring of the message, or if some
+    window of as many message tokens as the name has scores at least
+    `threshold` with difflib.SequenceMatcher.
+    """
+
+    def __init__(self, keys: list[str], threshold: float):
+        self.keys = keys
+        self.threshold = threshold
+        self._exact = _Automaton(keys)
+        self._filtered = threshold >= NGRAM_SAFE_THRESHOLD
+        self._slope = 1.5 * threshold - 1
+        self._lengths = [len(key) for key in keys]
+        # Token count -> bigram -> indices of names with that many tokens, each
+        # repeated as often as the bigram occurs in the name
+        self._postings: dict[int, dict[str, list[int]]] = defaultdict(lambda: defaultdict(list))
+        for idx, key in enumerate(keys):
+            n = len(key.split())
+            if n:
+                grams = _ngrams(key) if self._filtered else {"": 1}
+                for gram, count in grams.items():
+                    self._postings[n][gram].extend([idx] * count)
+        self._cache: OrderedDict[str, list[int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def match(self, message: str) -> list[int]:
+        """Indices into `keys` of the names mentioned in message, in key order."""
+        with self._lock:
+            if message in self._cache:
+                self._cache.move_to_end(message)
+                return self._cache[message]
+
+        found = self._exact.search(message)
+        tokens = message.split()
+        for n, postings in self._postings.items():
+            for i in range(len(tokens) - n + 1):
+                window = " ".join(tokens[i:i + n])
+                # Upper bound on the bigrams each name shares with the window
+                shared = Counter()
+                for gram in (_ngrams(window) if self._filtered else [""]):
+                    shared.update(postings.get(gram, ()))
+                if self._filtered:
+                    base = self._slope * len(window) + 1 - 1e-9
+                    candidates = [
+                        idx for idx, count in shared.items()
+                        if count >= base + self._slope * self._lengths[idx] and idx not in found
+                    ]
+                else:
+                    candidates = [idx for idx in shared if idx not in found]
+                if not candidates:
+                    continue
+                # difflib caches its lookup tables for seq2, so the window goes there
+                matcher = difflib.SequenceMatcher(None, "", window)
+                for idx in candidates:
+                    matcher.set_seq1(self.keys[idx])
+                    if (
+                        matcher.real_quick_ratio() >= self.threshold
+                        and matcher.quick_ratio() >= self.threshold
+                        and matcher.ratio() >= self.threshold
+                    ):
+                        found.add(idx)
+        result = sorted(found)
+
+        with self._lock:
+            self._cache[message] = result
+            if len(self._cache) > MATCH_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+
+@functools.lru_cache(maxsize=16)
+def matcher_for(names: tuple[str, ...], normalize: Callable[[str], str], threshold: float) -> EntityMatcher:
+    """Shared matcher for a name list, built on first use."""
+    return EntityMatcher([normalize(name) for name in names], threshold)
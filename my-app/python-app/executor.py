@@ -0,0 +1,85 @@
+"""
+Runs CPU-heavy analytics (regression fits and the like) off the event loop.
+
+A JobExecutor wraps a process pool sized to the machine's cores, falling back
+to a thread pool where processes are unavailable or when configured that way.
+Jobs are awaited with a per-job timeout and counted so that queue depth can be
+reported. A timed-out job that already started keeps its worker until it
+finishes; one still waiting in the queue is cancelled.
+"""
+
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+EXECUTOR_KINDS = ("process", "thread")
+
+
+class JobTimeout(Exception):
+    pass
+
+
+class JobExecutor:
+    def __init__(self, kind: str = "process", max_workers: Optional[int] = None, timeout: Optional[float] = None):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self._pool: Optional[Executor] = None
+        self._in_flight = 0
+        self._counts = {"submitted": 0, "completed": 0, "failed": 0, "timed_out": 0}
+
+    def _executor(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                try:
+                    self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                except (ImportError, NotImplementedError, OSError):
+                    # No working multiprocessing here (e.g. sandboxed or without sem_open)
+                    self.kind = "thread"
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None):
+        """Run fn(*args) on the pool. `fn` and its arguments must be picklable for a process pool."""
+        timeout = self.timeout if timeout is None else timeout
+        future = asyncio.get_running_loop().run_in_executor(self._executor(), fn, *args)
+        self._counts["submitted"] += 1
+        self._in_flight += 1
+        try:
+            result = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._counts["timed_out"] += 1
+            raise JobTimeout(f"{getattr(fn, '__name__', 'job')} exceeded {timeout}s")
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next job
+            self._counts["failed"] += 1
+            self._pool = None
+            raise
+        except Exception:
+            self._counts["failed"] += 1
+            raise
+        finally:
+            self._in_flight -= 1
+        self._counts["completed"] += 1
+        return result
+
+    def metrics(self) -> dict:
+        running = min(self._in_flight, self.max_workers)
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "running": running,
+            "queued": self._in_flight - running,
+            "timeout": self.timeout,
+            **self._counts,
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,93 @@
+"""
+Stored stockout forecasts, one StockoutForecast row per sector-resource.
+
+The forecast scheduler in api.py refits pairs whose stock data changed since
+their stored forecast (newest timestamp or row count differs) and saves the
+result here, so readers get forecasts from one indexed lookup instead of
+running the model on the request path.
+"""
+
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import func, or_
+from sqlmodel import Session, select
+from models import Sector, Resource, SectorResource, ResourceStockLevel, StockoutForecast
+
+TS_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def stale_forecasts(session: Session) -> dict[int, tuple[datetime, int]]:
+    """sector_resource_id -> (latest timestamp, row count) for pairs whose forecast is missing or out of date."""
+    versions = (
+        select(
+            ResourceStockLevel.sector_resource_id,
+            func.max(ResourceStockLevel.timestamp).label("last_timestamp"),
+            func.count().label("row_count"),
+        )
+        .group_by(ResourceStockLevel.sector_resource_id)
+        .subquery()
+    )
+    rows = session.exec(
+        select(versions.c.sector_resource_id, versions.c.last_timestamp, versions.c.row_count)
+        .outerjoin(StockoutForecast, StockoutForecast.sector_resource_id == versions.c.sector_resource_id)
+        .where(or_(
+            StockoutForecast.id.is_(None),
+            StockoutForecast.last_timestamp != versions.c.last_timestamp,
+            StockoutForecast.row_count != versions.c.row_count,
+        ))
+    ).all()
+    return {sr_id: (last_timestamp, row_count) for sr_id, last_timestamp, row_count in rows}
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    return datetime.strptime(value, TS_FORMAT) if value else None
+
+
+def save_forecast(session: Session, sector_resource_id: int, payload: Optional[dict], version: tuple[datetime, int]) -> None:
+    """Upsert one pair's forecast from a fit_window payload (None when the pair has too little data)."""
+    forecast = session.exec(
+        select(StockoutForecast).where(StockoutForecast.sector_resource_id == sector_resource_id)
+    ).first() or StockoutForecast(sector_resource_id=sector_resource_id)
+    result = (payload or {}).get("result") or {}
+    ci = (payload or {}).get("ci") or {}
+    forecast.t_star = result.get("t_star")
+    # A non-positive t_star or a failed interval means the fit sees no stockout coming (e.g. stock is rising)
+    stockout = forecast.t_star is not None and forecast.t_star > 0 and ci.get("OK")
+    forecast.t_star_ts = _parse_ts((payload or {}).get("t_star_ts")) if stockout else None
+    forecast.ci_lo_ts = _parse_ts((payload or {}).get("ci_lo_ts"))
+    forecast.ci_hi_ts = _parse_ts((payload or {}).get("ci_hi_ts"))
+    forecast.last_timestamp, forecast.row_count = version
+    forecast.fitted_at = datetime.now()
+    session.add(forecast)
+
+
+def days_remaining(forecast: StockoutForecast) -> Optional[float]:
+    """Days from the latest reading to the forecast stockout, or None if no stockout is forecast."""
+    # t_star <= 0 also covers rows saved before no-stockout fits were stored without t_star_ts
+    if forecast.t_star_ts is None or forecast.t_star is None or forecast.t_star <= 0:
+        return None
+    return round((forecast.t_star_ts - forecast.last_timestamp).total_seconds() / 86400, 1)
+
+
+def forecasts_query():
+    """(StockoutForecast, sector name, resource name) rows for every stored forecast."""
+    return (
+        select(StockoutForecast, Sector.sector_name, Resource.resource_name)
+        .join(SectorResource, SectorResource.id == StockoutForecast.sector_resource_id)
+        .join(Sector, Sector.id == SectorResource.sector_id)
+        .join(Resource, Resource.id == SectorResource.resource_id)
+    )
+
+
+def fetch_forecasts(session: Session) -> list:
+    return session.exec(forecasts_query()).all()
+
+
+def resource_days_remaining(rows) -> dict[str, float]:
+    """Resource name -> soonest forecast stockout (in days) across its sectors. Negative when it is overdue."""
+    soonest = {}
+    for forecast, _, resource_name in rows:
+        days = days_remaining(forecast)
+        if days is not None:
+            soonest[resource_name] = min(days, soonest.get(resource_name, days))
+    return soonest
@@ -0,0 +1,255 @@
+"""
+Incremental, append-only ingestion of sensor CSV drops into ResourceStockLevel.
+
+Drops use the historical_avengers_data.csv columns. Each sector-resource keeps
+a high-water mark (its latest stored timestamp); only rows past the mark are
+appended, and repeated (sector_resource_id, timestamp) pairs within a drop are
+skipped, so re-ingesting the same file is a no-op. The marks are only a fast
+path: a unique index on (sector_resource_id, timestamp) and ON CONFLICT DO
+NOTHING keep concurrent ingests from storing a row twice. A drop is parsed in
+full before anything is written, so a malformed row rejects the whole drop.
+
+Files are tailed through an IngestCursor holding the byte offset already
+consumed, so each run only reads what was appended since the last one. A
+trailing partial line is left for the next run. Malformed lines in a tailed
+file cannot be fixed and resent, so they are appended to `<path>.rejected`
+and the rest of the chunk is ingested.
+
+Usage:
+    cd my-app/python-app
+    python ingest.py path/to/drop.csv [--follow] [--interval 5]
+"""
+
+import argparse
+import csv
+import io
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+from database import create_db, engine
+from models import Sector, Resource, SectorResource, ResourceStockLevel, IngestCursor
+from rollups import record_stock_levels
+
+INGEST_BATCH_SIZE = 10_000
+FOLLOW_INTERVAL = 5.0
+
+logger = logging.getLogger(__name__)
+
+CSV_COLUMNS = ("timestamp", "sector_id", "resource_type", "stock_level", "usage_rate_hourly", "snap_event_detected")
+
+
+def high_water_marks(session: Session) -> dict[int, datetime]:
+    """sector_resource_id -> latest stored timestamp."""
+    return dict(session.exec(
+        select(ResourceStockLevel.sector_resource_id, func.max(ResourceStockLevel.timestamp))
+        .group_by(ResourceStockLevel.sector_resource_id)
+    ).all())
+
+
+def sector_resource_ids(session: Session) -> dict[tuple[str, str], int]:
+    """(sector name, resource name) -> sector_resource_id."""
+    return {
+        (sector, resource): sr_id
+        for sector, resource, sr_id in session.exec(
+            select(Sector.sector_name, Resource.resource_name, SectorResource.id)
+            .join(Sector, Sector.id == SectorResource.sector_id)
+            .join(Resource, Resource.id == SectorResource.resource_id)
+        ).all()
+    }
+
+
+def _insert_new(session: Session, batch: list[dict]) -> list[dict]:
+    """Insert stock rows, skipping any already stored. Returns the rows actually inserted."""
+    insert = postgresql_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = (
+        insert(ResourceStockLevel)
+        .on_conflict_do_nothing(index_elements=["sector_resource_id", "timestamp"])
+        .returning(
+            ResourceStockLevel.timestamp,
+            ResourceStockLevel.stock_level,
+            ResourceStockLevel.usage,
+            ResourceStockLevel.snap_event,
+            ResourceStockLevel.sector_resource_id,
+        )
+    )
+    return [dict(row._mapping) for row in session.execute(stmt, batch)]
+
+
+def parse_row(row: dict, sr_map: dict[tuple[str, str], int]) -> Optional[dict]:
+    """A ResourceStockLevel insert row from a CSV row, or None for an unknown pair. Raises ValueError if malformed."""
+    if None in row or None in row.values():
+        raise ValueError("wrong number of fields")
+    sr_id = sr_map.get((row["sector_id"], row["resource_type"]))
+    if sr_id is None:
+        return None
+    return {
+        "timestamp": datetime.fromisoformat(row["timestamp"]),
+        "stock_level": float(row["stock_level"]),
+        "usage": float(row["usage_rate_hourly"]),
+        "snap_event": row["snap_event_detected"] == "True",
+        "sector_resource_id": sr_id,
+    }
+
+
+def ingest_rows(session: Session, rows: Iterable[dict], batch_size: int = INGEST_BATCH_SIZE) -> dict:
+    """Append CSV rows (dicts keyed by CSV_COLUMNS) past each pair's high-water mark and commit.
+
+    Every row is parsed before the first insert, so a malformed one raises
+    ValueError with nothing written. Returns counts of rows
+    inserted, skipped as already ingested, and skipped for naming an unknown
+    sector-resource pair, plus the sector_resource_ids appended to.
+    """
+    sr_map = sector_resource_ids(session)
+    marks = high_water_marks(session)
+    stats = {"inserted": 0, "duplicates": 0, "unknown": 0}
+    seen = set()
+    touched = set()
+    records = []
+
+    for n, row in enumerate(rows, 1):
+        try:
+            record = parse_row(row, sr_map)
+        except ValueError as e:
+            raise ValueError(f"row {n}: {e}") from e
+        if record is None:
+            stats["unknown"] += 1
+            continue
+        sr_id, ts = record["sector_resource_id"], record["timestamp"]
+        mark = marks.get(sr_id)
+        if (mark is not None and ts <= mark) or (sr_id, ts) in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add((sr_id, ts))
+        records.append(record)
+
+    for i in range(0, len(records), batch_size):
+        batch = records[i:i + batch_size]
+        # Another ingest may have stored some of these since the marks were read
+        inserted = _insert_new(session, batch)
+        record_stock_levels(session, inserted)
+        session.commit()
+        stats["inserted"] += len(inserted)
+        stats["duplicates"] += len(batch) - len(inserted)
+        touched.update(row["sector_resource_id"] for row in inserted)
+    stats["sector_resource_ids"] = sorted(touched)
+    return stats
+
+
+def ingest_text(session: Session, text: str, batch_size: int = INGEST_BATCH_SIZE) -> dict:
+    """Ingest a whole CSV drop (header included) held in memory."""
+    reader = csv.DictReader(io.StringIO(text))
+    missing = set(CSV_COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(sorted(missing))}")
+    return ingest_rows(session, reader, batch_size)
+
+
+def ingest_file(session: Session, path: str, batch_size: int = INGEST_BATCH_SIZE) -> dict:
+    """Ingest whatever has been appended to `path` since the last call. Restarts if the file shrank."""
+    path = os.path.abspath(path)
+    cursor = session.get(IngestCursor, path) or IngestCursor(path=path)
+    if os.path.getsize(path) < cursor.offset:
+        # Truncated or replaced; the high-water marks still keep this from duplicating rows
+        cursor.offset, cursor.header = 0, ""
+
+    with open(path, "rb") as f:
+        f.seek(cursor.offset)
+        data = f.read()
+    # Only consume complete lines; a writer may be midway through the last one
+    end = data.rfind(b"\n") + 1
+    lines = data[:end].decode("utf-8").splitlines()
+    if not cursor.header and lines:
+        cursor.header = lines.pop(0)
+
+    stats = {"inserted": 0, "duplicates": 0, "unknown": 0, "sector_resource_ids": []}
+    rejected = []
+    if lines:
+        fieldnames = next(csv.reader([cursor.header]))
+        try:
+            stats = ingest_rows(session, csv.DictReader(lines, fieldnames=fieldnames), batch_size)
+        except ValueError as e:
+            logger.warning("Malformed rows in %s (%s); moving them to %s.rejected", path, e, path)
+            lines, rejected = _split_malformed(session, lines, fieldnames)
+            _quarantine(path, cursor.header, rejected)
+            stats = ingest_rows(session, csv.DictReader(lines, fieldnames=fieldnames), batch_size)
+    stats["rejected"] = len(rejected)
+    stats["bytes_read"] = end
+
+    cursor.offset += end
+    cursor.updated_at = datetime.now()
+    session.add(cursor)
+    session.commit()
+    return stats
+
+
+def _split_malformed(session: Session, lines: list[str], fieldnames: list[str]) -> tuple[list[str], list[str]]:
+    """(lines that parse, lines that do not)."""
+    sr_map = sector_resource_ids(session)
+    good, bad = [], []
+    for line in lines:
+        row = next(csv.DictReader([line], fieldnames=fieldnames), None)
+        if row is None:
+            continue  # blank
+        try:
+            parse_row(row, sr_map)
+        except ValueError:
+            bad.append(line)
+        else:
+            good.append(line)
+    return good, bad
+
+
+def _quarantine(path: str, header: str, lines: list[str]) -> None:
+    rejected_path = f"{path}.rejected"
+    is_new = not os.path.exists(rejected_path)
+    with open(rejected_path, "a", encoding="utf-8") as f:
+        if is_new:
+            f.write(header + "\n")
+        f.writelines(line + "\n" for line in lines)
+
+
+def follow(path: str, interval: float = FOLLOW_INTERVAL, batch_size: int = INGEST_BATCH_SIZE) -> None:
+    """Tail `path`, ingesting new rows as they are appended, until interrupted."""
+    while True:
+        try:
+            with Session(engine) as session:
+                stats = ingest_file(session, path, batch_size)
+            if stats["bytes_read"]:
+                print(_summary(stats))
+        except Exception:
+            # e.g. the database is locked or the file is briefly missing; try again next poll
+            logger.exception("Ingesting %s failed", path)
+        time.sleep(interval)
+
+
+def _summary(stats: dict) -> str:
+    summary = f"Ingested {stats['inserted']} rows ({stats['duplicates']} already present, {stats['unknown']} unknown pairs)"
+    if stats.get("rejected"):
+        summary += f"; {stats['rejected']} malformed rows moved to .rejected"
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append new rows from a sensor CSV drop to jarvis.db.")
+    parser.add_argument("path", help="CSV file in the historical_avengers_data.csv format")
+    parser.add_argument("--follow", action="store_true", help="keep tailing the file for new rows")
+    parser.add_argument("--interval", type=float, default=FOLLOW_INTERVAL, help="seconds between polls with --follow")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="rows per commit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    create_db()
+    if args.follow:
+        try:
+            follow(args.path, args.interval, args.batch_size)
+        except KeyboardInterrupt:
+            pass
+    else:
+        with Session(engine) as session:
+            print(_summary(ingest_file(session, args.path, args.batch_size)))
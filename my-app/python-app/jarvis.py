@@ -1,18 +1,37 @@
 import json
+import logging
 import re
-import difflib
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import NamedTuple
 from openai import AsyncOpenAI
 from config import Config
 
+try:
+    import tiktoken
+except ImportError:  # optional; token counts fall back to an estimate
+    tiktoken = None
+
 openai_client = AsyncOpenAI(api_key=Config.OPENAI_API_KEY)
+logger = logging.getLogger(__name__)
 
-from redact_report import redact_reports, redact_contact
+from entity_matcher import matcher_for
+from report_index import ReportIndex
 
 
 # ---------------------------------------------------------------------------
 # Detector protocol
 # ---------------------------------------------------------------------------
 
+PRIORITY_RANK = {"Routine": 0, "High": 1, "Avengers Level Threat": 2}
+
+
+class ContextLine(NamedTuple):
+    text: str
+    # Set on report lines, which may be dropped (lowest priority, then oldest first) to fit the prompt budget
+    report: dict | None = None
+
+
 class JarvisDetector:
     """
     Base class for Jarvis response detectors.
@@ -22,12 +41,18 @@ class JarvisDetector:
       - declares its JSON field via `schema()`
       - appends a final override instruction via `instruction()` (placed last)
       - pulls its value out of the parsed response via `extract()`
+      - names the data its context draws on via `cache_keys()`, for the response cache
     """
 
     def context(self) -> str:
         """Data/context appended to the system prompt."""
         return ""
 
+    def context_lines(self) -> list[ContextLine]:
+        """context() as lines; override to tag report lines so they can be trimmed to the prompt budget."""
+        text = self.context()
+        return [ContextLine(text)] if text else []
+
     def schema(self) -> str:
         """JSON field string added to the response format description."""
         return ""
@@ -44,6 +69,10 @@ class JarvisDetector:
         """Optionally transforms message content before it is sent to the LLM."""
         return messages
 
+    def cache_keys(self) -> list[tuple]:
+        """Keys of the data context() reads; a cached reply is dropped when any of them is bumped."""
+        return []
+
 
 class ResourceDetector(JarvisDetector):
     """Detects which known resources the user is referring to.
@@ -56,63 +85,63 @@ class ResourceDetector(JarvisDetector):
     def __init__(
         self,
         resource_names: list[str],
-        reports: list[dict],
+        reports: ReportIndex,
         last_message: str = "",
+        days_remaining: dict[str, float] | None = None,
     ):
         self.resource_names = resource_names
         self.reports = reports
         self.last_message = last_message.lower()
+        # Resource name -> soonest forecast stockout in days, from the StockoutForecast table
+        self.days_remaining = days_remaining or {}
 
     FUZZY_THRESHOLD = 0.75
 
-    def _normalize(self, s: str) -> str:
+    @staticmethod
+    def _normalize(s: str) -> str:
         """Lowercase and strip trailing unit annotations like '(L)'."""
         return re.sub(r'\s*\(.*?\)$', '', s).strip().lower()
 
     def _mentioned(self) -> list[str]:
-        message_tokens = self.last_message.split()
-        mentioned = []
-
-        for resource in self.resource_names:
-            resource_clean = self._normalize(resource)
-            resource_tokens = resource_clean.split()
-            n = len(resource_tokens)
-
-            if resource_clean in self.last_message:
-                mentioned.append(resource)
-                continue
-
-            for i in range(len(message_tokens) - n + 1):
-                window = ' '.join(message_tokens[i:i + n])
-                ratio = difflib.SequenceMatcher(None, resource_clean, window).ratio()
-                if ratio >= self.FUZZY_THRESHOLD:
-                    mentioned.append(resource)
-                    break
-
-        return mentioned
+        matcher = matcher_for(tuple(self.resource_names), self._normalize, self.FUZZY_THRESHOLD)
+        return [self.resource_names[i] for i in matcher.match(self.last_message)]
 
     def context(self) -> str:
-        lines = [f"Available resources: {', '.join(self.resource_names)}"]
+        return "\n".join(line.text for line in self.context_lines())
+
+    def context_lines(self) -> list[ContextLine]:
+        lines = [ContextLine(f"Available resources: {', '.join(self.resource_names)}")]
 
         mentioned = self._mentioned()
         if mentioned:
             for resource in mentioned:
-                relevant = [r for r in redact_reports(self.reports) if resource.lower() in r["rawText"].lower()]
+                relevant = self.reports.search(resource)
                 print("Relevant Report:", relevant)
-                lines.append(f"\n[{resource}]")
-                lines.append(f"  Reports ({len(relevant)} total):")
+                lines.append(ContextLine(f"\n[{resource}]"))
+                days = self.days_remaining.get(resource)
+                if days is not None and days < 0:
+                    lines.append(ContextLine(f"  Forecast stockout passed {-days} days ago"))
+                elif days is not None:
+                    lines.append(ContextLine(f"  Forecast stockout in {days} days"))
+                lines.append(ContextLine(f"  Reports ({len(relevant)} total):"))
                 for r in relevant:
-                    lines.append(
-                        f"    [{r['timestamp'][:16]}] {'[REDACTED]'} | {r['priority']} | {r['rawText']}"
-                    )
-        elif self.reports:
-            lines.append("\nRecent reports:")
-            for r in redact_reports(self.reports[:5]):
-                lines.append(
-                    f"  [{r['timestamp'][:16]}] [REDACTED] | {r['priority']} | {r['rawText'][:120]}"
-                )
-
-        return "\n".join(lines)
+                    lines.append(ContextLine(
+                        f"    [{r['timestamp'][:16]}] {'[REDACTED]'} | {r['priority']} | {r['rawText']}", r
+                    ))
+        elif recent := self.reports.recent(limit=5):
+            lines.append(ContextLine("\nRecent reports:"))
+            for r in recent:
+                lines.append(ContextLine(
+                    f"  [{r['timestamp'][:16]}] [REDACTED] | {r['priority']} | {r['rawText'][:120]}", r
+                ))
+
+        return lines
+
+    def cache_keys(self) -> list[tuple]:
+        mentioned = self._mentioned()
+        if not mentioned:
+            return [("recent",)]
+        return [("resource", resource) for resource in mentioned]
 
     def instruction(self) -> str:
         if not self._mentioned():
@@ -143,55 +172,43 @@ class HeroDetector(JarvisDetector):
     def __init__(
         self,
         hero_aliases: list[str],
-        reports: list[dict],
+        reports: ReportIndex,
         last_message: str = "",
     ):
         self.hero_aliases = hero_aliases
         self.reports = reports
         self.last_message = last_message.lower()
 
-    def _normalize(self, s: str) -> str:
+    @staticmethod
+    def _normalize(s: str) -> str:
         return s.strip().lower()
 
     def _mentioned(self) -> list[str]:
-        message_tokens = self.last_message.split()
-        mentioned = []
-
-        for alias in self.hero_aliases:
-            alias_clean = self._normalize(alias)
-            alias_tokens = alias_clean.split()
-            n = len(alias_tokens)
-
-            if alias_clean in self.last_message:
-                mentioned.append(alias)
-                continue
-
-            for i in range(len(message_tokens) - n + 1):
-                window = ' '.join(message_tokens[i:i + n])
-                ratio = difflib.SequenceMatcher(None, alias_clean, window).ratio()
-                if ratio >= self.FUZZY_THRESHOLD:
-                    mentioned.append(alias)
-                    break
-
-        return mentioned
+        matcher = matcher_for(tuple(self.hero_aliases), self._normalize, self.FUZZY_THRESHOLD)
+        return [self.hero_aliases[i] for i in matcher.match(self.last_message)]
 
     def context(self) -> str:
+        return "\n".join(line.text for line in self.context_lines())
+
+    def context_lines(self) -> list[ContextLine]:
         mentioned = self._mentioned()
         if not mentioned:
-            return ""
+            return []
 
         lines = []
         for alias in mentioned:
-            relevant = [r for r in self.reports if self._normalize(r.get("heroAlias", "")) == self._normalize(alias)]
-            safe = redact_reports(relevant)
-            lines.append(f"\n[Field operative: REDACTED]")
-            lines.append(f"  Reports ({len(safe)} total):")
+            safe = self.reports.by_alias(alias)
+            lines.append(ContextLine(f"\n[Field operative: REDACTED]"))
+            lines.append(ContextLine(f"  Reports ({len(safe)} total):"))
             for r in safe:
-                lines.append(
-                    f"    [{r['timestamp'][:16]}] [REDACTED] | {r['priority']} | {r['rawText']}"
-                )
+                lines.append(ContextLine(
+                    f"    [{r['timestamp'][:16]}] [REDACTED] | {r['priority']} | {r['rawText']}", r
+                ))
+
+        return lines
 
-        return "\n".join(lines)
+    def cache_keys(self) -> list[tuple]:
+        return [("hero", alias.strip().lower()) for alias in self._mentioned()]
 
     def sanitize_messages(self, messages: list[dict]) -> list[dict]:
         """Replace detected hero aliases in the user/assistant message content."""
@@ -247,12 +264,77 @@ BASE_INSTRUCTIONS = """
     """
 
 
-def _build_system_prompt(detectors: list[JarvisDetector]) -> str:
-    context_blocks = [d.context() for d in detectors if d.context()]
-    schema_fields = [d.schema() for d in detectors if d.schema()]
-    instruction_blocks = [d.instruction() for d in detectors if d.instruction()]
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        return tiktoken.encoding_for_model(Config.MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in text for Config.MODEL; roughly 4 characters per token without tiktoken."""
+    if tiktoken is None:
+        return (len(text) + 3) // 4
+    return len(_encoding().encode(text))
+
+
+@dataclass
+class SystemPrompt:
+    text: str
+    # Token counts by section ("static", "context", "instructions", "total") and report lines dropped
+    tokens: dict = field(default_factory=dict)
+    dropped_report_lines: int = 0
+
+
+def _fit_context(blocks: list[list[ContextLine]], budget: int) -> tuple[list[list[ContextLine]], int]:
+    """Drop report lines, lowest priority then oldest first, until the blocks fit in budget tokens."""
+    cost = {}
+    fixed = 0
+    for block in blocks:
+        for i, line in enumerate(block):
+            # +1 for the newline joining it to the next line
+            n = count_tokens(line.text) + 1
+            if line.report is None:
+                fixed += n
+            else:
+                cost[(id(block), i)] = n
+    if fixed + sum(cost.values()) <= budget:
+        return blocks, 0
+
+    reports = {(id(block), i): line.report for block in blocks for i, line in enumerate(block) if line.report is not None}
+    keep_order = sorted(
+        cost,
+        key=lambda k: (PRIORITY_RANK.get(reports[k].get("priority"), 0), reports[k].get("timestamp", "")),
+        reverse=True,
+    )
+    kept, used = set(), fixed
+    for k in keep_order:
+        if used + cost[k] <= budget:
+            kept.add(k)
+            used += cost[k]
+    fitted = [
+        [line for i, line in enumerate(block) if line.report is None or (id(block), i) in kept]
+        for block in blocks
+    ]
+    return fitted, len(cost) - len(kept)
+
+
+def _build_system_prompt(detectors: list[JarvisDetector], budget: int | None = None) -> SystemPrompt:
+    """
+    Assemble the system prompt, calling each detector hook once.
 
-    context_section = ("\n\n" + "\n".join(context_blocks)) if context_blocks else ""
+    Static text (base instructions and the response format, which depends only
+    on which detectors run) comes first so consecutive requests share a
+    cacheable prefix. Per-request context follows, then instructions, which go
+    last so they are the final thing the model reads. Report lines are dropped
+    when the prompt would exceed `budget` tokens.
+    """
+    budget = Config.PROMPT_TOKEN_BUDGET if budget is None else budget
+    evaluated = [(d.context_lines(), d.schema(), d.instruction()) for d in detectors]
+    context_blocks = [lines for lines, _, _ in evaluated if lines]
+    schema_fields = [schema for _, schema, _ in evaluated if schema]
+    instruction_blocks = [instruction for _, _, instruction in evaluated if instruction]
 
     schema = '"response": "<your reply as a single string>"'
     if schema_fields:
@@ -265,37 +347,185 @@ def _build_system_prompt(detectors: list[JarvisDetector]) -> str:
 
     Only include names/values that exactly match the lists provided. Lists may be empty.
     """
+    static = BASE_INSTRUCTIONS + format_instruction
 
-    # Instructions go last so they are the final thing the model reads
     instruction_section = ("\n\n" + "\n\n".join(instruction_blocks)) if instruction_blocks else ""
 
-    return BASE_INSTRUCTIONS + context_section + format_instruction + instruction_section
+    static_tokens = count_tokens(static)
+    instruction_tokens = count_tokens(instruction_section)
+    context_blocks, dropped = _fit_context(context_blocks, budget - static_tokens - instruction_tokens)
+
+    context_text = "\n".join("\n".join(line.text for line in block) for block in context_blocks)
+    if dropped:
+        context_text += f"\n({dropped} older or lower-priority reports omitted)"
+    context_section = ("\n\n" + context_text) if context_blocks else ""
+    context_tokens = count_tokens(context_section)
+
+    return SystemPrompt(
+        text=static + context_section + instruction_section,
+        tokens={
+            "static": static_tokens,
+            "context": context_tokens,
+            "instructions": instruction_tokens,
+            "total": static_tokens + context_tokens + instruction_tokens,
+        },
+        dropped_report_lines=dropped,
+    )
+
+
+class ResponseFieldStream:
+    """
+    Pulls one top-level string field out of a JSON object that arrives in pieces.
+
+    feed() takes the next chunk of the streamed JSON text and returns the newly
+    decoded characters of the field's value, so they can be shown before the
+    object is complete.
+    """
+
+    def __init__(self, field: str = "response"):
+        self.field = field
+        self._depth = 0
+        self._in_string = False
+        self._is_key = False
+        self._expect_key = False
+        self._key: list[str] = []
+        self._last_key = None
+        self._capturing = False
+        self._escape = ""  # pending backslash escape, decoded once complete
+
+    def feed(self, chunk: str) -> str:
+        out = []
+        for ch in chunk:
+            if self._in_string:
+                if self._escape:
+                    self._escape += ch
+                    self._decode_escape(out)
+                elif ch == "\\":
+                    self._escape = ch
+                elif ch == '"':
+                    self._in_string = False
+                    self._capturing = False
+                    if self._is_key:
+                        self._last_key = "".join(self._key)
+                else:
+                    self._emit(ch, out)
+            elif ch == '"':
+                self._in_string = True
+                self._is_key = self._depth == 1 and self._expect_key
+                if self._is_key:
+                    self._key = []
+                    self._expect_key = False
+                else:
+                    self._capturing = self._depth == 1 and self._last_key == self.field
+            elif ch in "{[":
+                self._depth += 1
+                self._expect_key = ch == "{" and self._depth == 1
+            elif ch in "}]":
+                self._depth -= 1
+            elif ch == "," and self._depth == 1:
+                self._expect_key = True
+                self._last_key = None
+        return "".join(out)
+
+    def _emit(self, text: str, out: list[str]) -> None:
+        if self._is_key:
+            self._key.append(text)
+        elif self._capturing:
+            out.append(text)
+
+    def _decode_escape(self, out: list[str]) -> None:
+        esc = self._escape
+        if esc[1] != "u":
+            self._escape = ""
+            self._emit(json.loads(f'"{esc}"'), out)
+            return
+        if len(esc) < 6:
+            return
+        if 0xD800 <= int(esc[2:6], 16) < 0xDC00:
+            # High surrogate: decode together with the low surrogate escape that should follow
+            if len(esc) < 12 and "\\u".startswith(esc[6:8]):
+                return
+            if len(esc) < 12 or esc[6:8] != "\\u":
+                self._escape = ""
+                self._emit(json.loads(f'"{esc[:6]}"'), out)
+                # Not a surrogate pair after all; the rest is ordinary string content
+                out.append(self.feed(esc[6:]))
+                return
+        self._escape = ""
+        self._emit(json.loads(f'"{esc}"'), out)
 
 
 class Jarvis:
-    async def ask_jarvis(self, messageList: list[dict], detectors: list[JarvisDetector] | None = None):
-        detectors = detectors or []
+    def _messages(self, messageList: list[dict], detectors: list[JarvisDetector]) -> tuple[list[dict], SystemPrompt]:
         system_prompt = _build_system_prompt(detectors)
 
         sanitized_list = list(messageList or [])
         for detector in detectors:
             sanitized_list = detector.sanitize_messages(sanitized_list)
 
-        messages = [{"role": "system", "content": system_prompt}]
+        messages = [{"role": "system", "content": system_prompt.text}]
         for msg in sanitized_list:
             messages.append({"role": msg["role"], "content": msg["content"]})
+        return messages, system_prompt
+
+    def _result(self, content: str, detectors: list[JarvisDetector], system_prompt: SystemPrompt, usage=None) -> dict:
+        parsed = json.loads(content or "{}")
+
+        result = {"response": parsed.get("response", "")}
+        for detector in detectors:
+            result.update(detector.extract(parsed))
+
+        # Our estimate of the system prompt by section, plus what the API billed for the whole prompt
+        details = getattr(usage, "prompt_tokens_details", None)
+        result["promptTokens"] = {
+            **system_prompt.tokens,
+            "droppedReportLines": system_prompt.dropped_report_lines,
+            "billed": usage.prompt_tokens if usage else None,
+            "cached": getattr(details, "cached_tokens", None),
+        }
+        logger.debug("Jarvis prompt tokens: %s", result["promptTokens"])
+        return result
 
+    async def ask_jarvis(self, messageList: list[dict], detectors: list[JarvisDetector] | None = None):
+        detectors = detectors or []
+        messages, system_prompt = self._messages(messageList, detectors)
         response = await openai_client.chat.completions.create(
             model=Config.MODEL,
             response_format={"type": "json_object"},
             messages=messages,
             temperature=0,
         )
+        return self._result(response.choices[0].message.content, detectors, system_prompt, response.usage)
 
-        parsed = json.loads(response.choices[0].message.content or "{}")
-
-        result = {"response": parsed.get("response", "")}
-        for detector in detectors:
-            result.update(detector.extract(parsed))
-
-        return result
+    async def stream_jarvis(self, messageList: list[dict], detectors: list[JarvisDetector] | None = None):
+        """
+        ask_jarvis, streamed. Yields ("token", text) as the response field is
+        generated, then ("done", result) with the same dict ask_jarvis returns.
+        """
+        detectors = detectors or []
+        messages, system_prompt = self._messages(messageList, detectors)
+        stream = await openai_client.chat.completions.create(
+            model=Config.MODEL,
+            response_format={"type": "json_object"},
+            messages=messages,
+            temperature=0,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        response_field = ResponseFieldStream("response")
+        content = []
+        usage = None
+        async for chunk in stream:
+            # With include_usage the last chunk has no choices, only usage
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            content.append(delta)
+            text = response_field.feed(delta)
+            if text:
+                yield "token", text
+        yield "done", self._result("".join(content), detectors, system_prompt, usage)
@@ -0,0 +1,59 @@
+"""
+Live stockout estimates: one SlidingRegression per sector-resource, fed as rows arrive.
+
+Rows appended in time order update their pair in O(n log n); a row older than
+the pair's latest reading (a backfill) makes the caller reload that pair's
+window from the database instead.
+"""
+
+import datetime
+import threading
+from typing import Optional
+from regression import SlidingRegression
+
+
+class LiveRegressions:
+    def __init__(self, window: int):
+        self.window = window
+        self._fits: dict[int, SlidingRegression] = {}
+        self._lock = threading.Lock()
+
+    def load(self, windows: dict[int, list]) -> None:
+        """Replace the fits for the given pairs from chronological (timestamp, stock_level, snap_event) rows."""
+        fits = {}
+        for sr_id, rows in windows.items():
+            fit = SlidingRegression(self.window)
+            fit.extend((stock_level, snap_event, timestamp) for timestamp, stock_level, snap_event in rows)
+            fits[sr_id] = fit
+        with self._lock:
+            self._fits.update(fits)
+
+    def observe(self, sr_id: int, timestamp: datetime.datetime, stock_level: float, snap_event: bool) -> bool:
+        """Fold one new row into its pair. Returns False if the pair must be reloaded instead."""
+        with self._lock:
+            fit = self._fits.get(sr_id)
+            if fit is None or (fit.last_timestamp is not None and timestamp < fit.last_timestamp):
+                return False
+            fit.append(stock_level, snap_event, timestamp)
+            return True
+
+    def estimate(self, sr_id: int) -> Optional[dict]:
+        with self._lock:
+            fit = self._fits.get(sr_id)
+            result = fit.result() if fit is not None else None
+            t_0 = fit.t_0 if fit is not None else None
+        if result is None:
+            return None
+        estimate = result.to_dict()
+        del estimate["t_star_std"], estimate["ci_95"]
+        t_star = estimate["t_star"]
+        estimate["t_star_ts"] = (
+            (t_0 + datetime.timedelta(minutes=int(12 * t_star))).strftime("%Y-%m-%d %H:%M")
+            if t_star is not None and t_0 is not None else None
+        )
+        return estimate
+
+    def estimates(self) -> dict[int, Optional[dict]]:
+        with self._lock:
+            sr_ids = list(self._fits)
+        return {sr_id: self.estimate(sr_id) for sr_id in sr_ids}
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from typing import Optional, List
 from datetime import datetime, timedelta
 from enum import IntEnum
@@ -45,6 +46,13 @@ class SectorResource(SQLModel, table=True):
 
 
 class ResourceStockLevel(SQLModel, table=True):
+    # Covers the per-pair window reads (regression, rollup rebuild) without touching the table
+    __table_args__ = (
+        Index("ix_resourcestocklevel_window", "sector_resource_id", "timestamp", "stock_level", "usage", "snap_event"),
+        # One reading per pair and timestamp, so concurrent ingests cannot store a row twice
+        Index("ix_resourcestocklevel_reading", "sector_resource_id", "timestamp", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     timestamp: datetime = Field(default_factory=datetime.now)
     stock_level: float
@@ -55,7 +63,66 @@ class ResourceStockLevel(SQLModel, table=True):
     sector_resource: Optional[SectorResource] = Relationship(back_populates="stock_levels")
 
 
+class StockRollup(SQLModel, table=True):
+    """Pre-aggregated stock/usage for one sector-resource over one time bucket."""
+    __table_args__ = (
+        Index("ix_stockrollup_bucket", "bucket_minutes", "sector_resource_id", "bucket_start", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    bucket_minutes: int
+    bucket_start: datetime
+    sector_resource_id: int = Field(foreign_key="sectorresource.id")
+    resource_id: Optional[int] = Field(default=None, foreign_key="resource.id")
+    stock_sum: float = 0.0
+    usage_sum: float = 0.0
+    count: int = 0
+    last_timestamp: datetime
+    last_stock: float
+
+
+class IngestCursor(SQLModel, table=True):
+    """How far into a tailed CSV file incremental ingestion has read."""
+    path: str = Field(primary_key=True)
+    offset: int = 0
+    header: str = ""
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+
+class RegressionCacheEntry(SQLModel, table=True):
+    """Persisted /api/regression payload for one version of a sector-resource window."""
+    __table_args__ = (
+        Index("ix_regressioncacheentry_key", "sector_resource_id", "window", "last_timestamp", "snap_index", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    sector_resource_id: int = Field(foreign_key="sectorresource.id")
+    window: int
+    last_timestamp: datetime
+    snap_index: int = -1  # -1 when the window has no snap
+    payload: str
+    used_at: datetime = Field(default_factory=datetime.now, index=True)
+
+
+class StockoutForecast(SQLModel, table=True):
+    """Latest regression forecast for one sector-resource, written by the forecast scheduler."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    sector_resource_id: int = Field(foreign_key="sectorresource.id", unique=True)
+    t_star: Optional[float] = None  # 12-minute steps after the window start
+    t_star_ts: Optional[datetime] = None
+    ci_lo_ts: Optional[datetime] = None
+    ci_hi_ts: Optional[datetime] = None
+    # Version of the stock data the fit saw
+    last_timestamp: datetime
+    row_count: int
+    fitted_at: datetime = Field(default_factory=datetime.now)
+
+
 class Report(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_report_timestamp_priority", "timestamp", "priority"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     raw_text: str
     timestamp: datetime = Field(default_factory=datetime.now)
@@ -68,18 +135,27 @@ class Report(SQLModel, table=True):
     resource: Optional[Resource] = Relationship(back_populates="reports")
     sector: Optional[Sector] = Relationship(back_populates="reports")
 
+
+class ReportRedaction(SQLModel, table=True):
+    """Redacted variants of a report's raw_text, written with the report."""
+    report_id: int = Field(foreign_key="report.id", primary_key=True)
+    redacted_text: str  # aliases and phone numbers replaced
+    contact_redacted_text: str  # phone numbers replaced, aliases kept
+    alias_key: str = Field(index=True)  # redact_report.Redactor.key the text was redacted with
+    redacted_at: datetime = Field(default_factory=datetime.now)
+
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
-    email: str
+    email: str = Field(index=True)
 
     sessions: List["UserSession"] = Relationship(back_populates="user")
 
 
 class UserSession(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    session_token: str
+    session_token: str = Field(index=True)
     expires: datetime = Field(default_factory=lambda: datetime.utcnow() + timedelta(weeks=1))
-    user_id: int = Field(foreign_key="user.id")
+    user_id: int = Field(foreign_key="user.id", index=True)
 
     user: Optional[User] = Relationship(back_populates="sessions")
\ No newline at end of file
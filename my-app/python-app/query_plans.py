@@ -0,0 +1,99 @@
+"""
+Check that the hot API query paths use indexes instead of full table scans.
+
+Runs each path against a scratch copy of jarvis.db (with any missing indexes
+created), records every SQL statement it issues, and asserts that SQLite's
+EXPLAIN QUERY PLAN never scans one of the tables that grow over time.
+
+Usage:
+    cd my-app/python-app
+    python query_plans.py
+"""
+
+import base64
+import json
+import re
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from sqlalchemy import event
+from sqlmodel import Session, create_engine, select
+from database import create_db, engine
+from models import SectorResource
+
+import api
+
+# Tables whose size grows with usage; a full scan of any of them is a regression
+GROWING_TABLES = {"resourcestocklevel", "stockrollup", "report", "user", "usersession"}
+
+_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+
+def _fake_google_token(email: str) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({"email": email, "name": "Plan Check"}).encode()).decode().rstrip("=")
+    return f"x.{payload}.x"
+
+
+def hot_paths(session: Session) -> dict:
+    sr_ids = list(session.exec(select(SectorResource.id)).all())
+    token = _fake_google_token("query-plan-check@example.com")
+    return {
+        "login": lambda: api.login(api.LoginRequest(google_token=token), db=session),
+        "logout": lambda: api.logout(api.LogoutRequest(session_token="missing"), db=session),
+        "recent reports": lambda: api.fetch_recent_reports(session),
+        "dashboard reports": lambda: api.get_dashboard_reports(session=session),
+        "dashboard": lambda: api.get_dashboard(
+            session=session, points=api.CHART_POINTS, history_points=api.HISTORY_POINTS, downsample="lttb"
+        ),
+        "regression window": lambda: api.fetch_regression_windows(session, sr_ids[:1]),
+        "regression batch window": lambda: api.fetch_regression_windows(session, sr_ids),
+    }
+
+
+def full_scans(connection, statement: str, parameters) -> list[str]:
+    plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    # Walking an index in order under a LIMIT (newest-N queries) stops early, so it is not a full scan
+    limited = re.search(r"\bLIMIT\b", statement, re.IGNORECASE) is not None
+    scans = []
+    for detail in (row[-1] for row in plan):
+        m = _SCAN_RE.match(detail)
+        if not m or m.group(1).lower() not in GROWING_TABLES:
+            continue
+        if limited and " USING " in detail:
+            continue
+        scans.append(detail)
+    return scans
+
+
+def check() -> bool:
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = shutil.copy(engine.url.database, Path(tmp) / "jarvis.db")
+        check_engine = create_engine(f"sqlite:///{db_path}")
+        create_db(check_engine)
+        captured = []
+
+        @event.listens_for(check_engine, "before_cursor_execute")
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                captured.append((statement, parameters))
+
+        with Session(check_engine) as session:
+            for name, run in hot_paths(session).items():
+                captured.clear()
+                run()
+                statements = list(captured)
+                with check_engine.connect() as connection:
+                    scans = [s for statement, params in statements for s in full_scans(connection, statement, params)]
+                status = "FULL SCAN" if scans else "ok"
+                print(f"{name:<26} {len(statements):>3} queries  {status}")
+                for s in scans:
+                    print(f"    {s}")
+                ok = ok and not scans
+        check_engine.dispose()
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check() else 1)
@@ -1,38 +1,130 @@
+import hashlib
 import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Iterable
 
-_PHONE_RE = re.compile(
+REDACTED = "[REDACTED]"
+
+# Redacted rows remembered per (report id, mode)
+REDACTION_CACHE_SIZE = 4096
+
+_PHONE_PATTERN = (
     r'(\+?1[\s.-]?)?'          # optional country code
     r'(\(?\d{3}\)?[\s.-]?)'    # area code
     r'(\d{3}[\s.-]?)'          # exchange
     r'(\d{4})'                 # number
 )
+_PHONE_RE = re.compile(_PHONE_PATTERN)
+
+
+@lru_cache(maxsize=256)
+def _alias_re(alias: str) -> re.Pattern:
+    return re.compile(re.escape(alias), re.IGNORECASE)
+
+
+class Redactor:
+    """Redacts every known hero alias and phone number in one pass over the text."""
+
+    def __init__(self, aliases: Iterable[str] = ()):
+        self.aliases = frozenset(a for a in aliases if a)
+        # Identifies the alias set, so stored redactions can tell when they are out of date
+        self.key = hashlib.sha1("\n".join(sorted(self.aliases)).encode()).hexdigest()[:16]
+        self._known = {a.lower() for a in self.aliases}
+        # Longest first so an alias wins over any alias it contains
+        alternatives = [re.escape(a) for a in sorted(self.aliases, key=len, reverse=True)]
+        # The lookahead on possible first characters lets the regex engine skip most
+        # positions quickly, which the optional groups leading the phone pattern prevent
+        first = "".join(sorted({re.escape(a[0]) for a in self.aliases})) + r"+(\d"
+        self._pattern = re.compile(
+            f"(?=[{first}])(?:{'|'.join(alternatives + [_PHONE_PATTERN])})", re.IGNORECASE
+        )
+
+    def redact(self, text: str, alias: str | None = None) -> str:
+        """Full redaction. `alias` is redacted too even if the redactor was built without it."""
+        if alias and alias.lower() not in self._known:
+            text = _alias_re(alias).sub(REDACTED, text)
+        return self._pattern.sub(REDACTED, text)
+
+    def redact_contact(self, text: str) -> str:
+        """Phone numbers only."""
+        return _PHONE_RE.sub(REDACTED, text)
+
+
+_lock = threading.Lock()
+_redactor = Redactor()
+_version = 0
+# (report id, mode) -> (redactor version, report it was computed from, redacted report)
+_memo: OrderedDict[tuple, tuple[int, dict, dict]] = OrderedDict()
+
+
+def set_known_aliases(aliases: Iterable[str]) -> bool:
+    """Rebuild the shared redactor if the set of hero aliases changed. Returns True if it did."""
+    global _redactor, _version
+    aliases = frozenset(a for a in aliases if a)
+    with _lock:
+        if aliases == _redactor.aliases:
+            return False
+        _redactor = Redactor(aliases)
+        _version += 1
+        _memo.clear()
+        return True
+
+
+def redaction_key() -> str:
+    """Key of the alias set the shared redactor was built from."""
+    return _redactor.key
+
+
+def redact_text(text: str, alias: str | None = None) -> str:
+    return _redactor.redact(text or "", alias)
+
+
+def redact_contact_text(text: str) -> str:
+    return _redactor.redact_contact(text or "")
+
+
+def _memoized(report: dict, mode: str, build) -> dict:
+    report_id = report.get("id")
+    if report_id is None:
+        return build(_redactor, report)
+    key = (report_id, mode)
+    with _lock:
+        hit = _memo.get(key)
+        if hit is not None and hit[0] == _version and hit[1] == report:
+            _memo.move_to_end(key)
+            return dict(hit[2])
+        version, redactor = _version, _redactor
+    result = build(redactor, report)
+    with _lock:
+        if version == _version:
+            _memo[key] = (version, dict(report), result)
+            if len(_memo) > REDACTION_CACHE_SIZE:
+                _memo.popitem(last=False)
+    return dict(result)
+
+
+def _full(redactor: Redactor, report: dict) -> dict:
+    r = report.copy()
+    r["rawText"] = redactor.redact(r.get("rawText", "") or "", r.get("heroAlias"))
+    r["heroAlias"] = REDACTED
+    r.pop("heroContact", None)
+    return r
+
+
+def _contact(redactor: Redactor, report: dict) -> dict:
+    r = report.copy()
+    r["rawText"] = redactor.redact_contact(r.get("rawText", "") or "")
+    r.pop("heroContact", None)
+    return r
 
 
 def redact_reports(reports: list[dict]) -> list[dict]:
-    """Full redaction: alias replaced in field and rawText, contact removed."""
-    redacted = []
-    for report in reports:
-        r = report.copy()
-        raw = r.get("rawText", "") or ""
-        alias = r.get("heroAlias")
-        if alias:
-            raw = re.sub(re.escape(alias), "[REDACTED]", raw, flags=re.IGNORECASE)
-        raw = _PHONE_RE.sub("[REDACTED]", raw)
-        r["rawText"] = raw
-        r["heroAlias"] = "[REDACTED]"
-        r.pop("heroContact", None)
-        redacted.append(r)
-    return redacted
+    """Full redaction: known aliases and the report's own alias replaced in rawText, alias field replaced, contact removed."""
+    return [_memoized(report, "full", _full) for report in reports]
 
 
 def redact_contact(reports: list[dict]) -> list[dict]:
     """Light redaction: keeps hero alias visible, removes contact info and phone numbers from rawText."""
-    redacted = []
-    for report in reports:
-        r = report.copy()
-        raw = r.get("rawText", "") or ""
-        raw = _PHONE_RE.sub("[REDACTED]", raw)
-        r["rawText"] = raw
-        r.pop("heroContact", None)
-        redacted.append(r)
-    return redacted
+    return [_memoized(report, "contact", _contact) for report in reports]
@@ -1,6 +1,15 @@
 import numpy as np
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from collections import Counter, deque
 import datetime
+import heapq
+
+# Windows longer than this use the randomized slope selector instead of
+# materializing all n*(n-1)/2 pairwise slopes.
+EXACT_SLOPE_LIMIT = 2000
+
+# Upper bound on the working set of one batched bootstrap chunk.
+BOOT_CHUNK_BYTES = 64 * 1024 * 1024
 
 
 def _safe(v):
@@ -10,6 +19,259 @@ def _safe(v):
     f = float(v)
     return None if (np.isnan(f) or np.isinf(f)) else f
 
+def pairwise_slopes(t: np.ndarray, y: np.ndarray, distinct_only: bool = False) -> np.ndarray:
+    """All slopes (y[j] - y[i]) / (t[j] - t[i]) for i < j, in row-major pair order.
+
+    With `distinct_only`, pairs sharing the same t (bootstrap duplicates) are dropped.
+    """
+    i, j = np.triu_indices(len(t), k=1)
+    dt = t[j] - t[i]
+    dy = y[j] - y[i]
+    if distinct_only:
+        keep = dt != 0
+        dt, dy = dt[keep], dy[keep]
+    return dy / dt
+
+
+def _row_medians(values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Per-row median of the entries flagged in `valid`; NaN for rows with none.
+
+    Invalid entries are padded with -inf/+inf so that every row's median lands on
+    the same two columns, which lets one np.partition call serve the whole batch.
+    """
+    n_rows, width = values.shape
+    counts = valid.sum(axis=1)
+    k = (width - 1) // 2
+    n_low = k - (counts - 1) // 2
+    invalid_rank = np.cumsum(~valid, axis=1)
+    pad = np.where(invalid_rank <= n_low[:, None], -np.inf, np.inf)
+    filled = np.where(valid, values, pad)
+    kth = [k, k + 1] if k + 1 < width else [k]
+    part = np.partition(filled, kth, axis=1)
+    upper = np.where(counts % 2 == 0, k + 1, k).clip(max=width - 1)
+    # Rows with no valid entries are all padding (-inf + inf), so leave them NaN
+    rows = np.flatnonzero(counts > 0)
+    med = np.full(n_rows, np.nan)
+    med[rows] = (part[rows, k] + part[rows, upper[rows]]) / 2
+    return med
+
+
+def _weighted_medians(values: np.ndarray, first: np.ndarray, second: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Per-row median of sorted `values`, where values[p] occurs counts[:, first[p]] * counts[:, second[p]] times.
+
+    This is the median of the expanded multiset, so it matches np.median on the
+    resampled slopes exactly. Rows with zero total weight give NaN.
+    """
+    n_rows = counts.shape[0]
+    if len(values) == 0:
+        return np.full(n_rows, np.nan)
+    cum = np.cumsum(counts[:, first] * counts[:, second], axis=1)
+    total = cum[:, -1]
+    lower = np.empty(n_rows, dtype=np.int64)
+    upper = np.empty(n_rows, dtype=np.int64)
+    for r in range(n_rows):
+        lower[r], upper[r] = np.searchsorted(cum[r], [(total[r] - 1) // 2, total[r] // 2], side="right")
+    last = len(values) - 1
+    med = (values[lower.clip(max=last)] + values[upper.clip(max=last)]) / 2
+    return np.where(total > 0, med, np.nan)
+
+
+def _count_below(u: np.ndarray) -> int:
+    """Number of pairs i < j with u[j] < u[i], via a bottom-up merge over array blocks."""
+    n = len(u)
+    ranks = np.unique(u, return_inverse=True)[1].astype(np.int64).ravel()
+    idx = np.arange(n, dtype=np.int64)
+    total = 0
+    width = 1
+    while width < n:
+        block = idx // (2 * width)
+        right = (idx // width) % 2 == 1
+        left_keys = np.sort(block[~right] * n + ranks[~right])
+        rb, rr = block[right], ranks[right]
+        upper = np.searchsorted(left_keys, (rb + 1) * n, side="left")
+        lower = np.searchsorted(left_keys, rb * n + rr, side="right")
+        total += int((upper - lower).sum())
+        width *= 2
+    return total
+
+
+def _slopes_between(t: np.ndarray, y: np.ndarray, lo: float, hi: float) -> np.ndarray:
+    """Slopes in [lo, hi): exactly the pairs whose order by y - theta*t flips between lo and hi."""
+    n = len(t)
+    order = np.lexsort((np.arange(n), y - lo * t))
+    vals = (y - hi * t)[order].tolist()
+    ids = order.tolist()
+    first, second = [], []
+    for b in range(1, n):
+        v, vid = vals[b], ids[b]
+        k = b
+        while k > 0 and vals[k - 1] > v:
+            first.append(ids[k - 1])
+            second.append(vid)
+            vals[k], ids[k] = vals[k - 1], ids[k - 1]
+            k -= 1
+        vals[k], ids[k] = v, vid
+    a = np.minimum(first, second).astype(np.int64)
+    b = np.maximum(first, second).astype(np.int64)
+    return (y[b] - y[a]) / (t[b] - t[a])
+
+
+def _select_slope(t: np.ndarray, y: np.ndarray, k: int, sample: np.ndarray, max_iter: int = 64) -> float:
+    """k-th smallest pairwise slope (0-based) for strictly increasing t."""
+    n = len(t)
+    m_total = n * (n - 1) // 2
+    cap = max(4 * n, 1000)
+
+    def below(theta):
+        return _count_below(y - theta * t)
+
+    # Guaranteed bracket: every slope lies strictly inside (-bound, bound)
+    bound = float(np.ptp(y) / np.min(np.diff(t))) + 1.0
+    lo, hi = -bound, bound
+    n_lo, n_hi = 0, m_total
+
+    # Narrow it with sample quantiles around the target rank
+    s = len(sample)
+    spread = 3.0 * np.sqrt(s)
+    pos = k / m_total * s
+    lo_pos, hi_pos = int(np.floor(pos - spread)), int(np.ceil(pos + spread))
+    if lo_pos >= 0:
+        c = below(sample[lo_pos])
+        if c <= k:
+            lo, n_lo = float(sample[lo_pos]), c
+    if hi_pos < s:
+        c = below(sample[hi_pos])
+        if c > k:
+            hi, n_hi = float(sample[hi_pos]), c
+
+    for _ in range(max_iter):
+        if n_hi - n_lo <= cap:
+            break
+        mid = lo + (hi - lo) / 2
+        if mid <= lo or mid >= hi:
+            # No representable value left between lo and hi: the target equals lo
+            return lo
+        c = below(mid)
+        if c > k:
+            hi, n_hi = mid, c
+        else:
+            lo, n_lo = mid, c
+
+    inside = np.sort(_slopes_between(t, y, lo, hi))
+    if len(inside) == 0:
+        return lo
+    return float(inside[min(max(k - n_lo, 0), len(inside) - 1)])
+
+
+def median_slope(t: np.ndarray, y: np.ndarray, method: str = "auto", seed: int = 0) -> float:
+    """Theil-Sen slope: the median of all pairwise slopes, skipping pairs with equal t.
+
+    `method` is "exact" (materialize every slope, matches np.median bit for bit),
+    "randomized" (sample-bracketed slope selection, O(n log^2 n) array work plus
+    enumeration of the O(n) slopes left in the bracket), or "auto", which picks
+    "randomized" only for windows longer than EXACT_SLOPE_LIMIT with distinct t.
+    """
+    t = np.asarray(t, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(t)
+    if method not in ("auto", "exact", "randomized"):
+        raise ValueError(f"Unknown slope method: {method}")
+
+    order = np.argsort(t, kind="stable")
+    distinct = n < 2 or bool(np.all(np.diff(t[order]) > 0))
+    if method == "auto":
+        method = "randomized" if n > EXACT_SLOPE_LIMIT and distinct else "exact"
+    if method == "exact" or not distinct or n < 3:
+        return np.median(pairwise_slopes(t, y, distinct_only=not distinct))
+
+    t, y = t[order], y[order]
+    m_total = n * (n - 1) // 2
+    rng = np.random.default_rng(seed)
+    s = min(m_total, 32 * n)
+    a = rng.integers(0, n, size=s)
+    b = rng.integers(0, n - 1, size=s)
+    b = b + (b >= a)
+    i, j = np.minimum(a, b), np.maximum(a, b)
+    sample = np.sort((y[j] - y[i]) / (t[j] - t[i]))
+
+    k_lo, k_hi = (m_total - 1) // 2, m_total // 2
+    lower = _select_slope(t, y, k_lo, sample)
+    if k_hi == k_lo:
+        return lower
+    return (lower + _select_slope(t, y, k_hi, sample)) / 2
+
+
+class _SlidingMedian:
+    """Median of a multiset of floats under insertion and removal, in O(log m) per update.
+
+    Two heaps hold the lower and upper halves; removals are recorded and applied
+    lazily once the removed value reaches the top of its heap.
+    """
+
+    def __init__(self, values=()):
+        self.reset(values)
+
+    def reset(self, values) -> None:
+        values = np.sort(np.asarray(values, dtype=float))
+        half = (len(values) + 1) // 2
+        self._low = (-values[:half]).tolist()
+        self._high = values[half:].tolist()
+        heapq.heapify(self._low)
+        heapq.heapify(self._high)
+        self._low_size, self._high_size = half, len(values) - half
+        self._low_removed, self._high_removed = Counter(), Counter()
+
+    def __len__(self) -> int:
+        return self._low_size + self._high_size
+
+    def add(self, v: float) -> None:
+        if not self._low_size or v <= -self._low[0]:
+            heapq.heappush(self._low, -v)
+            self._low_size += 1
+        else:
+            heapq.heappush(self._high, v)
+            self._high_size += 1
+        self._rebalance()
+
+    def remove(self, v: float) -> None:
+        """Remove one occurrence of v, which must be present."""
+        # Tops are always live, so anything <= the lower top has a live copy in the lower half
+        if self._low_size and v <= -self._low[0]:
+            self._low_removed[-v] += 1
+            self._low_size -= 1
+            self._prune(self._low, self._low_removed)
+        else:
+            self._high_removed[v] += 1
+            self._high_size -= 1
+            self._prune(self._high, self._high_removed)
+        self._rebalance()
+
+    def median(self) -> float:
+        if not len(self):
+            return np.nan
+        if self._low_size > self._high_size:
+            return -self._low[0]
+        return (-self._low[0] + self._high[0]) / 2
+
+    @staticmethod
+    def _prune(heap: list, removed: Counter) -> None:
+        while heap and removed[heap[0]]:
+            removed[heap[0]] -= 1
+            heapq.heappop(heap)
+
+    def _rebalance(self) -> None:
+        if self._low_size > self._high_size + 1:
+            heapq.heappush(self._high, -heapq.heappop(self._low))
+            self._low_size -= 1
+            self._high_size += 1
+            self._prune(self._low, self._low_removed)
+        elif self._high_size > self._low_size:
+            heapq.heappush(self._low, -heapq.heappop(self._high))
+            self._high_size -= 1
+            self._low_size += 1
+            self._prune(self._high, self._high_removed)
+
+
 class RegressionResult:
     def __init__(self, alpha, beta, gamma, t_star, t_star_std, ci_95):
         self.alpha = alpha
@@ -31,11 +293,15 @@ class RegressionResult:
         }
 
 class Regression:
-    def __init__(self, stock_levels: np.ndarray, t_0: datetime.datetime, t_snap: Optional[int] = None):
+    def __init__(self, stock_levels: np.ndarray, t_0: datetime.datetime, t_snap: Optional[int] = None,
+                 slope_method: str = "auto", n_boot: int = 500, boot_chunk_bytes: int = BOOT_CHUNK_BYTES):
         self.stock_levels = np.array(stock_levels, dtype=float)
         self.T = len(stock_levels)
         self.t_0 = t_0
         self.t_snap = t_snap
+        self.slope_method = slope_method
+        self.n_boot = n_boot
+        self.boot_chunk_bytes = boot_chunk_bytes
         self.result = None
 
     def fit(self) -> RegressionResult:
@@ -46,16 +312,8 @@ class Regression:
             t_pre, y_pre = t[t < self.t_snap], y[t < self.t_snap]
             t_post, y_post = t[t >= self.t_snap], y[t >= self.t_snap]
 
-            def theil_sen_slope(tx, yx):
-                slopes = []
-                n = len(tx)
-                for i in range(n):
-                    for j in range(i+1, n):
-                        slopes.append((yx[j] - yx[i]) / (tx[j] - tx[i]))
-                return np.median(slopes)
-
-            beta_pre  = theil_sen_slope(t_pre, y_pre)
-            beta_post = theil_sen_slope(t_post, y_post)
+            beta_pre  = median_slope(t_pre, y_pre, self.slope_method)
+            beta_post = median_slope(t_post, y_post, self.slope_method)
             n_pre, n_post = len(t_pre), len(t_post)
             beta = (beta_pre * n_pre + beta_post * n_post) / (n_pre + n_post)
 
@@ -66,74 +324,75 @@ class Regression:
             t_star = -(alpha + gamma) / beta if beta != 0 else np.inf
 
         else:
-            slopes = []
-            for i in range(self.T):
-                for j in range(i+1, self.T):
-                    slopes.append((y[j] - y[i]) / (t[j] - t[i]))
-            beta = np.median(slopes)
+            beta = median_slope(t, y, self.slope_method)
             alpha = np.median(y - beta * t)
             gamma = 0.0
             t_star = -alpha / beta if beta != 0 else np.inf
 
-        # Bootstrap confidence interval
-        n_boot = 500
-        t_stars_boot = []
+        # Bootstrap confidence interval, evaluated in memory-bounded batches of resamples
         rng = np.random.default_rng(42)
+        idx = rng.integers(0, self.T, size=(self.n_boot, self.T))
+        if self.t_snap is not None:
+            pairs = {"pre": self._sorted_pairs(0, self.t_snap), "post": self._sorted_pairs(self.t_snap, self.T)}
+        else:
+            pairs = {"all": self._sorted_pairs(0, self.T)}
+        n_pairs = max(1, sum(len(p[0]) for p in pairs.values()))
+        # Weights, their running sum and the gathered counts are (rows, pairs) int64 arrays
+        chunk = max(1, self.boot_chunk_bytes // (4 * 8 * n_pairs))
+        batches = [self._bootstrap_t_stars(idx[s:s + chunk], pairs) for s in range(0, self.n_boot, chunk)]
+        t_stars_boot = np.concatenate(batches) if batches else np.empty(0)
 
-        for _ in range(n_boot):
-            idx = rng.integers(0, self.T, size=self.T)
-            t_b, y_b = t[idx], y[idx]
-
-            if self.t_snap is not None:
-                mask_pre  = idx < self.t_snap
-                mask_post = idx >= self.t_snap
-                t_pre_b, y_pre_b   = t_b[mask_pre],  y_b[mask_pre]
-                t_post_b, y_post_b = t_b[mask_post], y_b[mask_post]
-                if len(t_pre_b) < 2 or len(t_post_b) < 2:
-                    continue
-                slopes_pre, slopes_post = [], []
-                for i in range(len(t_pre_b)):
-                    for j in range(i+1, len(t_pre_b)):
-                        if t_pre_b[j] != t_pre_b[i]:
-                            slopes_pre.append((y_pre_b[j] - y_pre_b[i]) / (t_pre_b[j] - t_pre_b[i]))
-                for i in range(len(t_post_b)):
-                    for j in range(i+1, len(t_post_b)):
-                        if t_post_b[j] != t_post_b[i]:
-                            slopes_post.append((y_post_b[j] - y_post_b[i]) / (t_post_b[j] - t_post_b[i]))
-                if not slopes_pre or not slopes_post:
-                    continue
-                b_pre  = np.median(slopes_pre)
-                b_post = np.median(slopes_post)
-                b = (b_pre * len(t_pre_b) + b_post * len(t_post_b)) / (len(t_pre_b) + len(t_post_b))
-                a_pre  = np.median(y_pre_b  - b * t_pre_b)
-                a_post = np.median(y_post_b - b * t_post_b)
-                g = a_post - a_pre
-                a = a_pre
-                if b == 0:
-                    continue
-                t_stars_boot.append(-(a + g) / b)
-
-            else:
-                slopes_b = []
-                for i in range(self.T):
-                    for j in range(i+1, self.T):
-                        if t_b[j] != t_b[i]:
-                            slopes_b.append((y_b[j] - y_b[i]) / (t_b[j] - t_b[i]))
-                if not slopes_b:
-                    continue
-                b = np.median(slopes_b)
-                a = np.median(y_b - b * t_b)
-                if b == 0:
-                    continue
-                t_stars_boot.append(-a / b)
-
-        t_stars_boot = np.array(t_stars_boot)
         ci_lo, ci_hi = np.percentile(t_stars_boot, [2.5, 97.5]) if len(t_stars_boot) > 10 else (np.nan, np.nan)
         std_tstar = np.std(t_stars_boot) if len(t_stars_boot) > 10 else np.nan
 
         self.result = RegressionResult(alpha, beta, gamma, t_star, std_tstar, (ci_lo, ci_hi))
         return self.result
 
+    def _sorted_pairs(self, lo: int, hi: int):
+        """Pairwise slopes among points lo..hi-1 in ascending order, with each slope's point indices."""
+        t = np.arange(self.T, dtype=float)
+        y = self.stock_levels
+        i, j = np.triu_indices(max(hi - lo, 0), k=1)
+        i, j = i + lo, j + lo
+        slopes = (y[j] - y[i]) / (t[j] - t[i])
+        order = np.argsort(slopes, kind="stable")
+        return slopes[order], i[order], j[order]
+
+    def _bootstrap_t_stars(self, idx: np.ndarray, pairs: dict) -> np.ndarray:
+        """Stockout times for a (rows, T) batch of resample indices, skipping degenerate rows.
+
+        A resample's slopes are the base pairwise slopes weighted by how often each
+        endpoint was drawn (pairs drawn from the same point have no slope), so every
+        row reuses the same pre-sorted slope arrays in `pairs`.
+        """
+        n_rows = len(idx)
+        counts = np.bincount(
+            (np.arange(n_rows)[:, None] * self.T + idx).ravel(), minlength=n_rows * self.T
+        ).reshape(n_rows, self.T)
+        t_b = idx.astype(float)
+        y_b = self.stock_levels[idx]
+
+        if self.t_snap is not None:
+            pre = idx < self.t_snap
+            n_pre = pre.sum(axis=1)
+            n_post = self.T - n_pre
+            b_pre = _weighted_medians(*pairs["pre"], counts)
+            b_post = _weighted_medians(*pairs["post"], counts)
+            with np.errstate(invalid="ignore"):
+                b = (b_pre * n_pre + b_post * n_post) / (n_pre + n_post)
+            resid = y_b - b[:, None] * t_b
+            a_pre = _row_medians(resid, pre)
+            a_post = _row_medians(resid, ~pre)
+            g = a_post - a_pre
+            a = a_pre
+            keep = (n_pre >= 2) & (n_post >= 2) & ~np.isnan(b_pre) & ~np.isnan(b_post) & (b != 0)
+            return -(a[keep] + g[keep]) / b[keep]
+
+        b = _weighted_medians(*pairs["all"], counts)
+        a = np.median(y_b - b[:, None] * t_b, axis=1)
+        keep = ~np.isnan(b) & (b != 0)
+        return -a[keep] / b[keep]
+
     @staticmethod
     def _compute_weights(T, t_snap=None):
         t = np.arange(T, dtype=float)
@@ -189,3 +448,153 @@ class Regression:
             "ci_hi": _safe(ci_hi),
             "t_star": t_star,
         }
+
+
+class SlidingRegression:
+    """Theil-Sen point estimates over the latest `window` readings, updated one reading at a time.
+
+    The pairwise slopes on each side of the window's first snap are kept in
+    sliding medians, so appending a reading (and evicting the oldest) costs
+    O(n log n) instead of refitting from scratch. Estimates match
+    Regression.fit() on the same window; the bootstrap interval is not
+    maintained, so `result()` leaves it as NaN.
+    """
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._points = deque()  # (seq, stock_level, snap, timestamp)
+        self._next_seq = 0
+        self._snap_seq = None  # seq of the first snap still in the window
+        self._pre = _SlidingMedian()
+        self._post = _SlidingMedian()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    @property
+    def t_0(self) -> Optional[datetime.datetime]:
+        return self._points[0][3] if self._points else None
+
+    @property
+    def last_timestamp(self) -> Optional[datetime.datetime]:
+        return self._points[-1][3] if self._points else None
+
+    def _is_post(self, seq: int) -> bool:
+        return self._snap_seq is not None and seq >= self._snap_seq
+
+    def _slopes_to(self, seq: int, y: float) -> List[float]:
+        """Slopes between (seq, y) and every other point in the window on the same side of the snap."""
+        post = self._is_post(seq)
+        return [
+            (y - y_k) / (seq - seq_k) if seq > seq_k else (y_k - y) / (seq_k - seq)
+            for seq_k, y_k, _, _ in self._points
+            if seq_k != seq and self._is_post(seq_k) == post
+        ]
+
+    def extend(self, readings) -> None:
+        """Append many (stock_level, snap, timestamp) readings, regrouping the slopes once at the end."""
+        for stock_level, snap, timestamp in readings:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._points.append((seq, float(stock_level), bool(snap), timestamp))
+        while len(self._points) > self.window:
+            self._points.popleft()
+        self._snap_seq = next((s for s, _, snap, _ in self._points if snap), None)
+        self._rebuild()
+
+    def append(self, stock_level: float, snap: bool = False, timestamp: Optional[datetime.datetime] = None) -> None:
+        if len(self._points) >= self.window:
+            self._evict()
+        seq = self._next_seq
+        self._next_seq += 1
+        if snap and self._snap_seq is None:
+            self._snap_seq = seq
+        y = float(stock_level)
+        side = self._post if self._is_post(seq) else self._pre
+        for slope in self._slopes_to(seq, y):
+            side.add(slope)
+        self._points.append((seq, y, bool(snap), timestamp))
+
+    def _evict(self) -> None:
+        seq, y, _, _ = self._points[0]
+        if seq == self._snap_seq:
+            # The split moves to the next snap (or disappears); regroup every slope
+            self._points.popleft()
+            self._snap_seq = next((s for s, _, snap, _ in self._points if snap), None)
+            self._rebuild()
+            return
+        side = self._post if self._is_post(seq) else self._pre
+        for slope in self._slopes_to(seq, y):
+            side.remove(slope)
+        self._points.popleft()
+
+    def _rebuild(self) -> None:
+        seqs = np.array([p[0] for p in self._points], dtype=float)
+        ys = np.array([p[1] for p in self._points], dtype=float)
+        post = np.array([self._is_post(p[0]) for p in self._points], dtype=bool)
+        self._pre.reset(pairwise_slopes(seqs[~post], ys[~post]))
+        self._post.reset(pairwise_slopes(seqs[post], ys[post]))
+
+    def result(self) -> Optional[RegressionResult]:
+        if len(self._points) < 2:
+            return None
+        first = self._points[0][0]
+        t = np.array([p[0] - first for p in self._points], dtype=float)
+        y = np.array([p[1] for p in self._points], dtype=float)
+
+        if self._snap_seq is not None:
+            t_snap = self._snap_seq - first
+            t_pre, y_pre = t[t < t_snap], y[t < t_snap]
+            t_post, y_post = t[t >= t_snap], y[t >= t_snap]
+            beta_pre, beta_post = self._pre.median(), self._post.median()
+            n_pre, n_post = len(t_pre), len(t_post)
+            beta = (beta_pre * n_pre + beta_post * n_post) / (n_pre + n_post)
+
+            alpha_pre  = np.median(y_pre  - beta * t_pre)
+            alpha_post = np.median(y_post - beta * t_post)
+            gamma = alpha_post - alpha_pre
+            alpha = alpha_pre
+            t_star = -(alpha + gamma) / beta if beta != 0 else np.inf
+        else:
+            beta = self._pre.median()
+            alpha = np.median(y - beta * t)
+            gamma = 0.0
+            t_star = -alpha / beta if beta != 0 else np.inf
+
+        return RegressionResult(alpha, beta, gamma, t_star, np.nan, (np.nan, np.nan))
+
+
+def fit_window(timestamps: List[datetime.datetime], stock_levels: List[float], snap_flags: List[bool]) -> Dict[str, Any]:
+    """Fit one chronological stock window and build the /api/regression payload.
+
+    Module-level (and fed plain lists) so it can be shipped to a worker process.
+    """
+    t_0 = timestamps[0]
+    snap_indexes = [i for i, snap in enumerate(snap_flags) if snap]
+    t_snap = snap_indexes[0] if snap_indexes else None
+
+    reg = Regression(stock_levels, t_0, t_snap)
+    reg.fit()
+    result = reg.get_result_dict()
+    line = reg.get_line()
+    ci = reg.get_confidence_interval()
+
+    def idx_to_ts(idx):
+        if idx is None:
+            return None
+        return (t_0 + datetime.timedelta(minutes=int(12 * float(idx)))).strftime("%Y-%m-%d %H:%M")
+
+    t_star_ts = idx_to_ts(result.get("t_star")) if result else None
+    ci_lo_ts = idx_to_ts(ci.get("ci_lo")) if ci and ci.get("OK") else None
+    ci_hi_ts = idx_to_ts(ci.get("ci_hi")) if ci and ci.get("OK") else None
+
+    return {
+        "result": result,
+        "line": line,
+        "snap_indexes": snap_indexes,
+        "t_0": t_0.isoformat(),
+        "ci": ci,
+        "t_star_ts": t_star_ts,
+        "ci_lo_ts": ci_lo_ts,
+        "ci_hi_ts": ci_hi_ts,
+    }
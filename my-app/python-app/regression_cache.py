@@ -0,0 +1,117 @@
+"""
+LRU cache of /api/regression payloads keyed by the version of the window fitted.
+
+A window is identified by (sector_resource_id, row count, last timestamp, snap
+index): the fit is deterministic (seeded bootstrap), so the same key always
+gives the same payload. Appending a row changes the last timestamp and hence
+the key; writes that can change a window without moving its end (backdated
+rows) must call `invalidate`. With persistence on, entries are also written to
+the RegressionCacheEntry table so they survive restarts, capped at the same size.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import delete
+from sqlmodel import Session, select
+from models import RegressionCacheEntry
+
+REGRESSION_CACHE_SIZE = 256
+
+
+def cache_key(sector_resource_id: int, rows: list) -> tuple:
+    """Key for a chronological window of (timestamp, stock_level, snap_event) rows."""
+    snap_index = next((i for i, (_, _, snap) in enumerate(rows) if snap), -1)
+    return sector_resource_id, len(rows), rows[-1][0], snap_index
+
+
+class RegressionCache:
+    def __init__(self, max_entries: int = REGRESSION_CACHE_SIZE, bind=None):
+        """`bind` is an engine to persist entries to; None keeps the cache in memory only."""
+        self.max_entries = max_entries
+        self.bind = bind
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, dict] = OrderedDict()
+        # Endpoints reach the persisted table from worker threads
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[dict]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload
+        payload = self._load(key) if self.bind is not None else None
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, payload)
+        return payload
+
+    def put(self, key: tuple, payload: dict) -> None:
+        with self._lock:
+            self._remember(key, payload)
+        if self.bind is not None:
+            self._store(key, payload)
+
+    def invalidate(self, sector_resource_id: int) -> None:
+        """Drop every cached window of one sector-resource."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == sector_resource_id]:
+                del self._entries[key]
+        if self.bind is not None:
+            with Session(self.bind) as session:
+                session.execute(
+                    delete(RegressionCacheEntry).where(RegressionCacheEntry.sector_resource_id == sector_resource_id)
+                )
+                session.commit()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+    def _remember(self, key: tuple, payload: dict) -> None:
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _where(self, query, key: tuple):
+        sr_id, window, last_timestamp, snap_index = key
+        return (
+            query.where(RegressionCacheEntry.sector_resource_id == sr_id)
+            .where(RegressionCacheEntry.window == window)
+            .where(RegressionCacheEntry.last_timestamp == last_timestamp)
+            .where(RegressionCacheEntry.snap_index == snap_index)
+        )
+
+    def _load(self, key: tuple) -> Optional[dict]:
+        with Session(self.bind) as session:
+            entry = session.exec(self._where(select(RegressionCacheEntry), key)).first()
+            if entry is None:
+                return None
+            entry.used_at = datetime.now()
+            session.add(entry)
+            session.commit()
+            return json.loads(entry.payload)
+
+    def _store(self, key: tuple, payload: dict) -> None:
+        sr_id, window, last_timestamp, snap_index = key
+        with Session(self.bind) as session:
+            session.execute(self._where(delete(RegressionCacheEntry), key))
+            session.add(RegressionCacheEntry(
+                sector_resource_id=sr_id,
+                window=window,
+                last_timestamp=last_timestamp,
+                snap_index=snap_index,
+                payload=json.dumps(payload, default=float),
+            ))
+            # Keep the table to the same LRU cap as memory
+            stale = select(RegressionCacheEntry.id).order_by(RegressionCacheEntry.used_at.desc()).offset(self.max_entries)
+            session.execute(delete(RegressionCacheEntry).where(RegressionCacheEntry.id.in_(stale)))
+            session.commit()
@@ -0,0 +1,218 @@
+"""
+In-process index over recent field reports, for Jarvis context building.
+
+Each report is stored once with its redacted form, and indexed by resource,
+sector and hero id and by the tokens of its redacted text. Detectors look up
+candidate ids instead of rescanning and re-redacting the recent-report list on
+every chat turn. The index is loaded on startup and updated on POST /reports;
+the recency window is applied at lookup time, so reports age out on their own.
+Redacted text comes from the stored ReportRedaction when it is current.
+"""
+
+import bisect
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from redact_report import REDACTED, redact_reports, redaction_key
+
+# Reports Jarvis sees: any priority from the last RECENT_REPORT_DAYS days, High
+# and above from the last URGENT_REPORT_DAYS days
+RECENT_REPORT_DAYS = 50
+URGENT_REPORT_DAYS = 100
+
+PRIORITY_NAMES = {0: "Routine", 1: "High", 2: "Avengers Level Threat"}
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+@dataclass
+class IndexedReport:
+    id: int
+    timestamp: datetime
+    priority: int
+    resource_id: int
+    sector_id: int
+    hero_id: int
+    redacted: dict  # redact_reports() of the /reports/recent row
+    text: str       # lowercased redacted rawText, for substring checks
+
+
+def report_row(report, hero) -> dict:
+    return {
+        "id": report.id,
+        "heroAlias": hero.alias,
+        "timestamp": report.timestamp.isoformat(),
+        "priority": PRIORITY_NAMES.get(report.priority, "Routine"),
+        "rawText": report.raw_text,
+    }
+
+
+def in_window(priority: int, timestamp: datetime, now: datetime) -> bool:
+    if timestamp >= now - timedelta(days=RECENT_REPORT_DAYS):
+        return True
+    return priority >= 1 and timestamp >= now - timedelta(days=URGENT_REPORT_DAYS)
+
+
+def _affix_match(token: str, edge: str, word: str) -> bool:
+    if edge == "both":
+        return token in word
+    if edge == "start":
+        # The phrase may begin partway through a word of the text
+        return word.endswith(token)
+    return word.startswith(token)
+
+
+def _sort_key(entry: IndexedReport) -> tuple[datetime, int, int]:
+    # Newest first when reversed; ties break by priority then id, as the report queries return them
+    return entry.timestamp, -entry.priority, -entry.id
+
+
+class ReportIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._reports: dict[int, IndexedReport] = {}
+        # _sort_key of every report; reversed, this is the order /reports/recent returns
+        self._order: list[tuple[datetime, int, int]] = []
+        self._by_resource: dict[int, set[int]] = {}
+        self._by_sector: dict[int, set[int]] = {}
+        self._by_hero: dict[int, set[int]] = {}
+        self._alias_heroes: dict[str, set[int]] = {}
+        self._tokens: dict[str, set[int]] = {}
+        # (token, edge) -> vocabulary words it can be part of; extended as new words arrive
+        self._affixes: dict[tuple[str, str], list[str]] = {}
+
+    def load(self, rows: Iterable[tuple]) -> None:
+        """Index (Report, Hero, ReportRedaction or None) rows, replacing anything already indexed."""
+        with self._lock:
+            self._clear()
+            for report, hero, redaction in rows:
+                self._add(report, hero, redaction)
+
+    def add(self, report, hero, redaction=None) -> None:
+        with self._lock:
+            self._add(report, hero, redaction)
+
+    def _add(self, report, hero, redaction) -> None:
+        if report.id in self._reports:
+            self._remove(report.id)
+        row = report_row(report, hero)
+        if redaction is not None and redaction.alias_key == redaction_key():
+            redacted = {**row, "rawText": redaction.redacted_text, "heroAlias": REDACTED}
+        else:
+            redacted = redact_reports([row])[0]
+        entry = IndexedReport(
+            id=report.id,
+            timestamp=report.timestamp,
+            priority=report.priority,
+            resource_id=report.resource_id,
+            sector_id=report.sector_id,
+            hero_id=report.hero_id,
+            redacted=redacted,
+            text=redacted["rawText"].lower(),
+        )
+        self._reports[entry.id] = entry
+        bisect.insort(self._order, _sort_key(entry))
+        self._by_resource.setdefault(entry.resource_id, set()).add(entry.id)
+        self._by_sector.setdefault(entry.sector_id, set()).add(entry.id)
+        self._by_hero.setdefault(entry.hero_id, set()).add(entry.id)
+        self._alias_heroes.setdefault(hero.alias.strip().lower(), set()).add(entry.hero_id)
+        for token in set(_TOKEN_RE.findall(entry.text)):
+            if token not in self._tokens:
+                for (affix, edge), words in self._affixes.items():
+                    if _affix_match(affix, edge, token):
+                        words.append(token)
+            self._tokens.setdefault(token, set()).add(entry.id)
+
+    def _remove(self, report_id: int) -> None:
+        entry = self._reports.pop(report_id)
+        self._order.remove(_sort_key(entry))
+        self._by_resource[entry.resource_id].discard(entry.id)
+        self._by_sector[entry.sector_id].discard(entry.id)
+        self._by_hero[entry.hero_id].discard(entry.id)
+        for token in set(_TOKEN_RE.findall(entry.text)):
+            self._tokens[token].discard(entry.id)
+
+    def _newest_first(self, ids: Iterable[int], now: Optional[datetime]) -> list[IndexedReport]:
+        now = now or datetime.now()
+        entries = [self._reports[i] for i in ids]
+        entries = [e for e in entries if in_window(e.priority, e.timestamp, now)]
+        entries.sort(key=_sort_key, reverse=True)
+        return entries
+
+    def recent(self, limit: Optional[int] = None, now: Optional[datetime] = None) -> list[dict]:
+        """Redacted reports in the recency window, newest first."""
+        now = now or datetime.now()
+        rows = []
+        with self._lock:
+            for _, _, neg_id in reversed(self._order):
+                if limit is not None and len(rows) >= limit:
+                    break
+                entry = self._reports[-neg_id]
+                if in_window(entry.priority, entry.timestamp, now):
+                    rows.append(entry.redacted)
+        return rows
+
+    def lookup(
+        self,
+        resource_id: Optional[int] = None,
+        sector_id: Optional[int] = None,
+        hero_id: Optional[int] = None,
+        now: Optional[datetime] = None,
+    ) -> list[dict]:
+        """Redacted recent reports matching every given id, newest first."""
+        with self._lock:
+            ids = None
+            for postings, key in ((self._by_resource, resource_id), (self._by_sector, sector_id), (self._by_hero, hero_id)):
+                if key is not None:
+                    matched = postings.get(key, set())
+                    ids = set(matched) if ids is None else ids & matched
+            if ids is None:
+                ids = self._reports.keys()
+            return [e.redacted for e in self._newest_first(ids, now)]
+
+    def by_alias(self, alias: str, now: Optional[datetime] = None) -> list[dict]:
+        """Redacted recent reports filed by heroes with this alias (case-insensitive), newest first."""
+        with self._lock:
+            ids = set()
+            for hero_id in self._alias_heroes.get(alias.strip().lower(), ()):
+                ids |= self._by_hero.get(hero_id, set())
+            return [e.redacted for e in self._newest_first(ids, now)]
+
+    def search(self, phrase: str, now: Optional[datetime] = None) -> list[dict]:
+        """
+        Redacted recent reports whose redacted text contains phrase (case-insensitive),
+        newest first.
+
+        Candidates come from the token index: a token inside the phrase must be a
+        whole word of the text, while one at either edge may be part of a longer
+        word, so those are matched against the vocabulary by prefix/suffix.
+        """
+        phrase = phrase.lower()
+        with self._lock:
+            ids = None
+            for match in _TOKEN_RE.finditer(phrase):
+                token = match.group()
+                at_start, at_end = match.start() == 0, match.end() == len(phrase)
+                if not at_start and not at_end:
+                    words = [token] if token in self._tokens else []
+                else:
+                    words = self._affix_words(token, at_start, at_end)
+                matched = set().union(*(self._tokens[w] for w in words))
+                ids = matched if ids is None else ids & matched
+                if not ids:
+                    return []
+            if ids is None:
+                ids = self._reports.keys()
+            return [e.redacted for e in self._newest_first((i for i in ids if phrase in self._reports[i].text), now)]
+
+    def _affix_words(self, token: str, at_start: bool, at_end: bool) -> list[str]:
+        edge = "both" if at_start and at_end else "start" if at_start else "end"
+        key = (token, edge)
+        if key not in self._affixes:
+            self._affixes[key] = [w for w in self._tokens if _affix_match(token, edge, w)]
+        return self._affixes[key]
@@ -0,0 +1,61 @@
+"""
+Redacted report text, computed when a report is written instead of on every read.
+
+Each report gets one ReportRedaction row holding its fully redacted and
+contact-only text, tagged with the key of the hero alias set it was redacted
+against. redact_stale_reports backfills reports that have no row yet and
+re-redacts rows whose key no longer matches the current alias set; it runs on
+startup and whenever the hero list changes, or from the command line.
+"""
+
+import argparse
+from typing import Optional
+from sqlalchemy import delete, or_
+from sqlmodel import Session, select
+from database import create_db, engine
+from models import Hero, Report, ReportRedaction
+from redact_report import redact_contact_text, redact_text, redaction_key, set_known_aliases
+
+REDACTION_BATCH_SIZE = 500
+
+
+def redaction_for(report: Report, hero: Optional[Hero]) -> ReportRedaction:
+    return ReportRedaction(
+        report_id=report.id,
+        redacted_text=redact_text(report.raw_text, hero.alias if hero else None),
+        contact_redacted_text=redact_contact_text(report.raw_text),
+        alias_key=redaction_key(),
+    )
+
+
+def redact_stale_reports(session: Session, batch_size: int = REDACTION_BATCH_SIZE) -> int:
+    """Write redactions for reports missing one or redacted with another alias set. Returns the number written."""
+    key = redaction_key()
+    written = 0
+    while True:
+        rows = session.exec(
+            select(Report, Hero)
+            .outerjoin(Hero, Report.hero_id == Hero.id)
+            .outerjoin(ReportRedaction, ReportRedaction.report_id == Report.id)
+            .where(or_(ReportRedaction.report_id.is_(None), ReportRedaction.alias_key != key))
+            .order_by(Report.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return written
+        ids = [report.id for report, _ in rows]
+        session.exec(delete(ReportRedaction).where(ReportRedaction.report_id.in_(ids)))
+        session.add_all(redaction_for(report, hero) for report, hero in rows)
+        session.commit()
+        written += len(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill or refresh stored report redactions in jarvis.db.")
+    parser.add_argument("--batch-size", type=int, default=REDACTION_BATCH_SIZE, help="reports per commit")
+    args = parser.parse_args()
+
+    create_db()
+    with Session(engine) as session:
+        set_known_aliases(session.exec(select(Hero.alias)).all())
+        print(f"Redacted {redact_stale_reports(session, args.batch_size)} reports")
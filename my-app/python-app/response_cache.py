@@ -0,0 +1,131 @@
+"""
+TTL + LRU cache of /ask_jarvis results for repeated questions.
+
+Jarvis runs at temperature 0, so the same conversation over the same data gets
+the same reply. Entries are keyed by the normalized last message and a digest
+of the turns before it, and carry a stamp: the version of every piece of data
+the reply drew on (the catalog of resource names and hero aliases, plus the
+detectors' cache_keys(), e.g. ("resource", name) or ("hero", alias)). Writers
+bump those versions (a new report, stock rows or forecasts for a resource, a
+new hero or resource), so a hit is only served while its stamp is current.
+The TTL bounds staleness the versions cannot see, such as reports ageing out
+of the recency window or edits made outside the API.
+
+Token counts belong to the request that paid for them, so promptTokens is not
+stored; hits are marked "cached": true and report no billed or cached tokens.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+RESPONSE_CACHE_SIZE = 512
+RESPONSE_CACHE_TTL = 300.0
+
+# Every entry depends on the lists of resource names and hero aliases detection runs against
+CATALOG = ("catalog",)
+
+# promptTokens of a reply served from the cache: no OpenAI call was made
+CACHED_PROMPT_TOKENS = {"billed": None, "cached": None}
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_message(text: str) -> str:
+    """Lowercased, whitespace collapsed and trailing punctuation dropped."""
+    return _SPACE_RE.sub(" ", text or "").strip().lower().rstrip("?!. ")
+
+
+def cache_key(messages: list[dict]) -> Optional[tuple[str, str]]:
+    """(normalized last message, digest of the earlier turns), or None for an empty conversation."""
+    if not messages:
+        return None
+    history = [(m["role"], normalize_message(m["content"])) for m in messages[:-1]]
+    digest = hashlib.sha1(json.dumps(history).encode()).hexdigest()[:16]
+    return normalize_message(messages[-1]["content"]), digest
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+        # key -> (expires at, stamp, result)
+        self._entries: OrderedDict[tuple, tuple[float, tuple, dict]] = OrderedDict()
+        self._versions: dict[tuple, int] = {}
+        self._catalog: Optional[tuple] = None
+        # Reports and stock writes bump versions from worker threads
+        self._lock = threading.Lock()
+
+    def stamp(self, dependencies: Iterable[tuple]) -> tuple:
+        """Current versions of the catalog and the given data keys. Take it before building the reply."""
+        with self._lock:
+            return tuple((dep, self._versions.get(dep, 0)) for dep in sorted({CATALOG, *dependencies}))
+
+    def get(self, key: Optional[tuple]) -> Optional[dict]:
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, stamp, result = entry
+            if expires <= time.monotonic():
+                self.expired += 1
+            elif any(self._versions.get(dep, 0) != version for dep, version in stamp):
+                self.invalidated += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return {**result, "cached": True, "promptTokens": dict(CACHED_PROMPT_TOKENS)}
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Optional[tuple], stamp: tuple, result: dict) -> None:
+        if key is None:
+            return
+        with self._lock:
+            stored = {k: v for k, v in result.items() if k != "promptTokens"}
+            self._entries[key] = (time.monotonic() + self.ttl, stamp, stored)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def observe_catalog(self, resource_names: Iterable[str], hero_aliases: Iterable[str]) -> None:
+        """Bump the catalog if the names detection runs against changed since the last call."""
+        catalog = (tuple(sorted(resource_names)), tuple(sorted(hero_aliases)))
+        with self._lock:
+            if catalog == self._catalog:
+                return
+            changed = self._catalog is not None
+            self._catalog = catalog
+        if changed:
+            self.bump(CATALOG)
+
+    def bump(self, *dependencies: tuple) -> None:
+        """Mark data as changed. Entries stamped with an older version stop being served."""
+        with self._lock:
+            for dep in dependencies:
+                self._versions[dep] = self._versions.get(dep, 0) + 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "invalidated": self.invalidated,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
@@ -0,0 +1,234 @@
+"""
+Materialized time-bucket rollups of ResourceStockLevel.
+
+Each StockRollup row holds the stock/usage sums, row count and latest reading
+of one sector-resource over one bucket (12-minute, hourly or daily). Buckets
+are aligned to midnight, so day-aligned date filters select whole buckets.
+Rows are kept current by `record_stock_level` on every insert (or
+`record_stock_levels` for a batch), which add to each bucket with one
+INSERT ... ON CONFLICT DO UPDATE so concurrent writers cannot race on a new
+bucket, and `rebuild_rollups` recomputes them from the raw table.
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlmodel import Session, select
+from sqlalchemy import case, func, desc, insert, delete
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import SectorResource, ResourceStockLevel, StockRollup
+
+ROLLUP_BUCKETS = (12, 60, 24 * 60)
+
+
+def bucket_start(ts: datetime, minutes: int) -> datetime:
+    midnight = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    offset = (ts.hour * 60 + ts.minute) // minutes * minutes
+    return midnight + timedelta(minutes=offset)
+
+
+def pick_bucket(start: datetime, end: datetime, min_points: int) -> int:
+    """Coarsest bucket that still gives at least `min_points` buckets across [start, end]."""
+    span = (end - start).total_seconds() / 60
+    for minutes in reversed(ROLLUP_BUCKETS):
+        if span / minutes >= min_points:
+            return minutes
+    return ROLLUP_BUCKETS[0]
+
+
+def _add_to_buckets(session: Session, buckets: list[dict]) -> None:
+    """Add each bucket's sums and count to its StockRollup row, creating the row if missing."""
+    upsert = postgresql_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = upsert(StockRollup)
+    new = stmt.excluded
+    newer = new.last_timestamp >= StockRollup.last_timestamp
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["bucket_minutes", "sector_resource_id", "bucket_start"],
+        set_={
+            "stock_sum": StockRollup.stock_sum + new.stock_sum,
+            "usage_sum": StockRollup.usage_sum + new.usage_sum,
+            "count": StockRollup.count + new.count,
+            # SET sees the row as it was, so both compare against the old last_timestamp
+            "last_timestamp": case((newer, new.last_timestamp), else_=StockRollup.last_timestamp),
+            "last_stock": case((newer, new.last_stock), else_=StockRollup.last_stock),
+        },
+    )
+    session.execute(stmt, buckets)
+
+
+def record_stock_level(session: Session, level: ResourceStockLevel) -> None:
+    """Fold one new stock row into its buckets. Caller commits alongside the row itself."""
+    sr = session.get(SectorResource, level.sector_resource_id)
+    resource_id = sr.resource_id if sr else None
+    _add_to_buckets(session, [
+        {
+            "bucket_minutes": minutes,
+            "bucket_start": bucket_start(level.timestamp, minutes),
+            "sector_resource_id": level.sector_resource_id,
+            "resource_id": resource_id,
+            "stock_sum": level.stock_level,
+            "usage_sum": level.usage,
+            "count": 1,
+            "last_timestamp": level.timestamp,
+            "last_stock": level.stock_level,
+        }
+        for minutes in ROLLUP_BUCKETS
+    ])
+
+
+def record_stock_levels(session: Session, rows: list[dict]) -> None:
+    """Fold a batch of new stock rows into their buckets, touching each bucket once. Caller commits."""
+    if not rows:
+        return
+    sr_resource = dict(session.exec(select(SectorResource.id, SectorResource.resource_id)).all())
+    deltas = {}
+    for row in rows:
+        for minutes in ROLLUP_BUCKETS:
+            key = (minutes, row["sector_resource_id"], bucket_start(row["timestamp"], minutes))
+            delta = deltas.get(key)
+            if delta is None:
+                delta = deltas[key] = {"stock_sum": 0.0, "usage_sum": 0.0, "count": 0, "last_timestamp": None}
+            delta["stock_sum"] += row["stock_level"]
+            delta["usage_sum"] += row["usage"]
+            delta["count"] += 1
+            if delta["last_timestamp"] is None or row["timestamp"] >= delta["last_timestamp"]:
+                delta["last_timestamp"] = row["timestamp"]
+                delta["last_stock"] = row["stock_level"]
+
+    _add_to_buckets(session, [
+        {
+            "bucket_minutes": minutes,
+            "bucket_start": start,
+            "sector_resource_id": sr_id,
+            "resource_id": sr_resource.get(sr_id),
+            **delta,
+        }
+        for (minutes, sr_id, start), delta in deltas.items()
+    ])
+
+
+def rebuild_rollups(session: Session, batch_size: int = 10_000) -> int:
+    """Recompute every bucket from the raw stock table in one ordered pass. Returns rollup rows written."""
+    session.execute(delete(StockRollup))
+    sr_resource = dict(session.exec(select(SectorResource.id, SectorResource.resource_id)).all())
+
+    rows = session.exec(
+        select(
+            ResourceStockLevel.sector_resource_id,
+            ResourceStockLevel.timestamp,
+            ResourceStockLevel.stock_level,
+            ResourceStockLevel.usage,
+        )
+        .order_by(ResourceStockLevel.sector_resource_id, ResourceStockLevel.timestamp)
+        .execution_options(yield_per=batch_size)
+    )
+
+    # Rows arrive ordered by (pair, time), so each granularity has at most one open bucket
+    open_buckets = {}
+    pending = []
+    written = 0
+
+    def close(bucket):
+        nonlocal written
+        pending.append(bucket)
+        written += 1
+        if len(pending) >= batch_size:
+            session.execute(insert(StockRollup), pending)
+            pending.clear()
+
+    for sr_id, ts, stock, usage in rows:
+        for minutes in ROLLUP_BUCKETS:
+            start = bucket_start(ts, minutes)
+            bucket = open_buckets.get(minutes)
+            if bucket is None or bucket["sector_resource_id"] != sr_id or bucket["bucket_start"] != start:
+                if bucket is not None:
+                    close(bucket)
+                bucket = open_buckets[minutes] = {
+                    "bucket_minutes": minutes,
+                    "bucket_start": start,
+                    "sector_resource_id": sr_id,
+                    "resource_id": sr_resource.get(sr_id),
+                    "stock_sum": 0.0,
+                    "usage_sum": 0.0,
+                    "count": 0,
+                }
+            bucket["stock_sum"] += stock
+            bucket["usage_sum"] += usage
+            bucket["count"] += 1
+            bucket["last_timestamp"] = ts
+            bucket["last_stock"] = stock
+
+    for bucket in open_buckets.values():
+        close(bucket)
+    if pending:
+        session.execute(insert(StockRollup), pending)
+    session.commit()
+    return written
+
+
+def ensure_rollups(session: Session) -> None:
+    """Backfill rollups for databases seeded before they existed."""
+    has_rollups = session.exec(select(StockRollup.id).limit(1)).first() is not None
+    has_levels = session.exec(select(ResourceStockLevel.id).limit(1)).first() is not None
+    if has_levels and not has_rollups:
+        rebuild_rollups(session)
+
+
+def _in_range(query, start: Optional[datetime], end: Optional[datetime]):
+    if start:
+        query = query.where(StockRollup.bucket_start >= start)
+    if end:
+        query = query.where(StockRollup.bucket_start <= end)
+    return query
+
+
+def fetch_date_bounds(session: Session) -> tuple[Optional[datetime], Optional[datetime]]:
+    """First and last daily bucket holding any data."""
+    return session.exec(
+        select(func.min(StockRollup.bucket_start), func.max(StockRollup.bucket_start))
+        .where(StockRollup.bucket_minutes == ROLLUP_BUCKETS[-1])
+    ).one()
+
+
+def fetch_pair_stats(session: Session, start: Optional[datetime], end: Optional[datetime]) -> dict[int, tuple[float, float]]:
+    """sector_resource_id -> (latest stock, average usage) within the range, read from daily buckets."""
+    daily = _in_range(
+        select(
+            StockRollup.sector_resource_id,
+            StockRollup.last_stock,
+            func.row_number().over(
+                partition_by=StockRollup.sector_resource_id,
+                order_by=desc(StockRollup.bucket_start),
+            ).label("rn"),
+            func.sum(StockRollup.usage_sum).over(partition_by=StockRollup.sector_resource_id).label("usage_sum"),
+            func.sum(StockRollup.count).over(partition_by=StockRollup.sector_resource_id).label("n"),
+        ).where(StockRollup.bucket_minutes == ROLLUP_BUCKETS[-1]),
+        start,
+        end,
+    ).subquery()
+    return {
+        sr_id: (last_stock, usage_sum / n)
+        for sr_id, last_stock, usage_sum, n in session.exec(
+            select(daily.c.sector_resource_id, daily.c.last_stock, daily.c.usage_sum, daily.c.n)
+            .where(daily.c.rn == 1)
+        ).all()
+    }
+
+
+def fetch_resource_buckets(session: Session, minutes: int, start: Optional[datetime], end: Optional[datetime]) -> list:
+    """(bucket_start, resource_id, stock_sum, usage_sum, count) per bucket and resource, oldest first."""
+    return session.exec(
+        _in_range(
+            select(
+                StockRollup.bucket_start,
+                StockRollup.resource_id,
+                func.sum(StockRollup.stock_sum),
+                func.sum(StockRollup.usage_sum),
+                func.sum(StockRollup.count),
+            ).where(StockRollup.bucket_minutes == minutes),
+            start,
+            end,
+        )
+        .group_by(StockRollup.bucket_start, StockRollup.resource_id)
+        .order_by(StockRollup.bucket_start)
+    ).all()
@@ -4,16 +4,40 @@ Seed the jarvis.db SQLite database from the challenger_package data files.
 Usage:
     cd my-app/python-app
     python seeddb.py
+    python seeddb.py --bulk [--chunk-size 50000]
+
+--bulk streams both data files into batched Core inserts on one connection,
+committing every --chunk-size rows with WAL and synchronous=OFF for the
+duration of the load. The stock-level indexes are dropped during the load and
+rebuilt once at the end. If pyarrow is installed and the Parquet copy of the
+stock CSV is current (written by challenger_package/data_analytics/columnar.py),
+stock levels are read from it instead of the CSV.
 """
 
+import argparse
 import csv
 import json
+import os
+import time
 from datetime import datetime
+from sqlalchemy import insert
 from sqlmodel import Session, select
 from database import create_db, engine
 from models import Hero, Sector, Resource, SectorResource, ResourceStockLevel, Report, Priority
+from rollups import rebuild_rollups
+
+try:
+    import pyarrow.dataset as pa_ds
+except ImportError:  # optional; only needed to read the Parquet copy of the stock CSV
+    pa_ds = None
 
 DATA_DIR = "../../challenger_package"
+STOCK_CSV = f"{DATA_DIR}/avengers_data_with_snap.csv"
+# STOCK_CSV = f"{DATA_DIR}/cleaned_avengers_data.csv"
+REPORTS_JSON = f"{DATA_DIR}/field_intel_reports.json"
+STOCK_PARQUET = f"{DATA_DIR}/parquet/avengers_data_with_snap"
+
+BULK_CHUNK_SIZE = 50_000
 
 SECTORS = ["Avengers Compound", "New Asgard", "Sanctum Sanctorum", "Sokovia", "Wakanda"]
 RESOURCES = ["Arc Reactor Cores", "Clean Water (L)", "Medical Kits", "Pym Particles", "Vibranium (kg)"]
@@ -33,6 +57,64 @@ PRIORITY_MAP = {
 }
 
 
+def report_fields(r: dict, hero_map: dict, sector_map: dict, resource_map: dict) -> dict | None:
+    """Column values for one field intel report, or None if its hero is unknown."""
+    hero_id = hero_map.get(r["metadata"]["hero_alias"])
+    if hero_id is None:
+        return None
+
+    raw = r["raw_text"]
+    # Extract sector and resource from raw_text
+    sector_id = None
+    resource_id = None
+    for s in SECTORS:
+        if s in raw:
+            sector_id = sector_map[s]
+            break
+    for res in RESOURCES:
+        if res in raw:
+            resource_id = resource_map[res]
+            break
+
+    # Default to first sector/resource if not found in text
+    if sector_id is None:
+        sector_id = sector_map[SECTORS[0]]
+    if resource_id is None:
+        resource_id = resource_map[RESOURCES[0]]
+
+    return dict(
+        raw_text=raw,
+        timestamp=datetime.fromisoformat(r["timestamp"]),
+        priority=PRIORITY_MAP.get(r["priority"], Priority.Routine),
+        hero_id=hero_id,
+        resource_id=resource_id,
+        sector_id=sector_id,
+    )
+
+
+def iter_json_array(f, read_size: int = 1 << 16):
+    """Yield the items of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buf = f.read(read_size).lstrip()
+    if not buf.startswith("["):
+        raise ValueError("expected a JSON array")
+    buf = buf[1:]
+    while True:
+        buf = buf.lstrip().lstrip(",").lstrip()
+        if buf.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buf)
+        except json.JSONDecodeError:
+            more = f.read(read_size)
+            if not more:
+                raise
+            buf += more
+            continue
+        yield item
+        buf = buf[end:]
+
+
 def seed():
     create_db()
 
@@ -85,8 +167,7 @@ def seed():
 
         # --- Stock Levels from CSV ---
         stock_count = 0
-        # with open(f"{DATA_DIR}/cleaned_avengers_data.csv", newline="") as f:
-        with open(f"{DATA_DIR}/avengers_data_with_snap.csv", newline="") as f:
+        with open(STOCK_CSV, newline="") as f:
             reader = csv.DictReader(f)
             for row in reader:
                 sector_name = row["sector_id"]
@@ -106,50 +187,169 @@ def seed():
         print(f"Seeded {stock_count} stock level records")
 
         # --- Reports from JSON ---
-        with open(f"{DATA_DIR}/field_intel_reports.json") as f:
+        with open(REPORTS_JSON) as f:
             reports = json.load(f)
 
         report_count = 0
         for r in reports:
-            hero_alias = r["metadata"]["hero_alias"]
-            hero_id = hero_map.get(hero_alias)
-            if hero_id is None:
+            fields = report_fields(r, hero_map, sector_map, resource_map)
+            if fields is None:
                 continue
-
-            raw = r["raw_text"]
-            # Extract sector and resource from raw_text
-            sector_id = None
-            resource_id = None
-            for s in SECTORS:
-                if s in raw:
-                    sector_id = sector_map[s]
-                    break
-            for res in RESOURCES:
-                if res in raw:
-                    resource_id = resource_map[res]
-                    break
-
-            # Default to first sector/resource if not found in text
-            if sector_id is None:
-                sector_id = sector_map[SECTORS[0]]
-            if resource_id is None:
-                resource_id = resource_map[RESOURCES[0]]
-
-            report = Report(
-                raw_text=raw,
-                timestamp=datetime.fromisoformat(r["timestamp"]),
-                priority=PRIORITY_MAP.get(r["priority"], Priority.Routine),
-                hero_id=hero_id,
-                resource_id=resource_id,
-                sector_id=sector_id,
-            )
-            session.add(report)
+            session.add(Report(**fields))
             report_count += 1
         print(f"Seeded {report_count} reports")
 
         session.commit()
+
+        rollup_count = rebuild_rollups(session)
+        print(f"Built {rollup_count} stock rollup buckets")
         print("Done! Database seeded successfully.")
 
 
+def _insert_chunked(conn, table, rows, chunk_size: int, label: str) -> int:
+    """executemany `rows` into `table`, committing every chunk_size rows and reporting throughput."""
+    stmt = insert(table)
+    total = 0
+    start = time.perf_counter()
+    batch = []
+
+    def flush():
+        nonlocal total
+        conn.execute(stmt, batch)
+        conn.commit()
+        total += len(batch)
+        rate = total / max(time.perf_counter() - start, 1e-9)
+        print(f"  {label}: {total:,} rows ({rate:,.0f} rows/s)")
+        batch.clear()
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            flush()
+    if batch:
+        flush()
+    return total
+
+
+def _stock_rows(sr_map: dict):
+    if pa_ds is not None and os.path.isdir(STOCK_PARQUET) and os.path.getmtime(STOCK_PARQUET) >= os.path.getmtime(STOCK_CSV):
+        yield from _stock_parquet_rows(sr_map)
+        return
+    with open(STOCK_CSV, newline="") as f:
+        reader = csv.reader(f)
+        col = {name: i for i, name in enumerate(next(reader))}
+        ts, sector, resource = col["timestamp"], col["sector_id"], col["resource_type"]
+        stock, usage, snap = col["stock_level"], col["usage_rate_hourly"], col["snap_event_detected"]
+        for row in reader:
+            sr_id = sr_map.get((row[sector], row[resource]))
+            if sr_id is None:
+                continue
+            yield {
+                "timestamp": datetime.fromisoformat(row[ts]),
+                "stock_level": float(row[stock]),
+                "usage": float(row[usage]),
+                "snap_event": row[snap] == "True",
+                "sector_resource_id": sr_id,
+            }
+
+
+def _stock_parquet_rows(sr_map: dict):
+    dataset = pa_ds.dataset(STOCK_PARQUET, format="parquet", partitioning="hive")
+    # "row" is the reading's line in the source CSV, so ids come out in the same order as the CSV path
+    table = dataset.to_table(columns=[
+        "row", "timestamp", "sector_id", "resource_type", "stock_level", "usage_rate_hourly", "snap_event_detected",
+    ]).sort_by("row")
+    for batch in table.to_batches(max_chunksize=BULK_CHUNK_SIZE):
+        cols = batch.to_pydict()
+        for ts, sector, resource, stock, usage, snap in zip(
+            cols["timestamp"], cols["sector_id"], cols["resource_type"],
+            cols["stock_level"], cols["usage_rate_hourly"], cols["snap_event_detected"],
+        ):
+            sr_id = sr_map.get((sector, resource))
+            if sr_id is None:
+                continue
+            yield {
+                "timestamp": ts,
+                "stock_level": stock,
+                "usage": usage,
+                "snap_event": snap,
+                "sector_resource_id": sr_id,
+            }
+
+
+def _report_rows(hero_map: dict, sector_map: dict, resource_map: dict):
+    with open(REPORTS_JSON) as f:
+        for r in iter_json_array(f):
+            fields = report_fields(r, hero_map, sector_map, resource_map)
+            if fields is not None:
+                yield fields
+
+
+def bulk_seed(chunk_size: int = BULK_CHUNK_SIZE):
+    create_db()
+
+    with engine.connect() as conn:
+        if conn.execute(select(Hero.id).limit(1)).first() is not None:
+            print("Database already seeded. Delete jarvis.db and re-run to reseed.")
+            return
+
+        journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+        synchronous = conn.exec_driver_sql("PRAGMA synchronous").scalar()
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        stock_table = ResourceStockLevel.__table__
+        try:
+            conn.execute(insert(Hero.__table__), [{"alias": a, "contact": c} for a, c in HEROES.items()])
+            conn.execute(insert(Sector.__table__), [{"sector_name": name} for name in SECTORS])
+            conn.execute(insert(Resource.__table__), [{"resource_name": name} for name in RESOURCES])
+            hero_map = dict(conn.execute(select(Hero.alias, Hero.id)).all())
+            sector_map = dict(conn.execute(select(Sector.sector_name, Sector.id)).all())
+            resource_map = dict(conn.execute(select(Resource.resource_name, Resource.id)).all())
+            conn.execute(insert(SectorResource.__table__), [
+                {"sector_id": sector_map[s], "resource_id": resource_map[r]} for s in SECTORS for r in RESOURCES
+            ])
+            sr_map = {
+                (s, r): sr_id
+                for s, r, sr_id in conn.execute(
+                    select(Sector.sector_name, Resource.resource_name, SectorResource.id)
+                    .join(Sector, Sector.id == SectorResource.sector_id)
+                    .join(Resource, Resource.id == SectorResource.resource_id)
+                ).all()
+            }
+            conn.commit()
+            print(f"Seeded {len(hero_map)} heroes, {len(sector_map)} sectors, "
+                  f"{len(resource_map)} resources, {len(sr_map)} sector-resource pairs")
+
+            # Maintaining the indexes row by row is slower than building them once afterwards
+            for index in stock_table.indexes:
+                index.drop(conn, checkfirst=True)
+            stock_count = _insert_chunked(conn, stock_table, _stock_rows(sr_map), chunk_size, "stock levels")
+            for index in stock_table.indexes:
+                index.create(conn, checkfirst=True)
+            conn.commit()
+            print(f"Seeded {stock_count} stock level records")
+
+            report_count = _insert_chunked(
+                conn, Report.__table__, _report_rows(hero_map, sector_map, resource_map), chunk_size, "reports"
+            )
+            print(f"Seeded {report_count} reports")
+        finally:
+            conn.rollback()
+            conn.exec_driver_sql(f"PRAGMA synchronous={synchronous}")
+            conn.exec_driver_sql(f"PRAGMA journal_mode={journal_mode}")
+
+    with Session(engine) as session:
+        rollup_count = rebuild_rollups(session)
+    print(f"Built {rollup_count} stock rollup buckets")
+    print("Done! Database seeded successfully.")
+
+
 if __name__ == "__main__":
-    seed()
+    parser = argparse.ArgumentParser(description="Seed jarvis.db from the challenger_package data files.")
+    parser.add_argument("--bulk", action="store_true", help="stream the data files into batched inserts")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE, help="rows per commit with --bulk")
+    args = parser.parse_args()
+    if args.bulk:
+        bulk_seed(args.chunk_size)
+    else:
+        seed()
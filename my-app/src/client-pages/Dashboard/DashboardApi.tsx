@@ -13,6 +13,7 @@ export interface ResourceItem {
   usage: number;
   history: ResourceHistoryPoint[];
   pctChange: number | null;
+  daysRemaining: number | null;
 }
 
 export interface ReportItem {
@@ -35,7 +36,7 @@ export interface ReportDetail {
 
 export interface DashboardData {
   resourceCount: number;
-  daysRemaining: number;
+  daysRemaining: number | null;
   minDate: string | null;
   maxDate: string | null;
   resources: ResourceItem[];
@@ -14,7 +14,7 @@ function PulseDots() {
 }
 
 export default function JarvisOverlay(){
-    const { askingPrompt, transcript } = useJarvis();
+    const { askingPrompt, transcript, streamingResponse } = useJarvis();
     const { loading } = useLoading();
     if (!askingPrompt) return null;
     return(
@@ -22,7 +22,9 @@ export default function JarvisOverlay(){
             <div className="jarvis-hud">
                 <PulseDots />
                 <div className="jarvis-hud__text">
-                    {loading
+                    {streamingResponse
+                        ? <span className="jarvis-hud__transcript">{streamingResponse}</span>
+                        : loading
                         ? <span className="jarvis-hud__status">Just a moment…</span>
                         : <span className="jarvis-hud__transcript">{transcript || 'Listening…'}</span>
                     }
@@ -14,6 +14,7 @@ const TRIGGER_STRINGS = [
 interface JarvisContextType {
     askingPrompt: boolean;
     transcript: string;
+    streamingResponse: string;
     referencedResources: string[];
 }
 
@@ -22,6 +23,44 @@ interface Message{
     content: string;
 }
 
+interface JarvisResult {
+    response: string;
+    referencedResources?: string[];
+    referencedHeroes?: string[];
+}
+
+// Reads the Server-Sent Events from /ask_jarvis?stream=true, calling onToken as the reply is generated
+async function streamJarvis(messageList: Message[], onToken: (text: string) => void): Promise<JarvisResult> {
+    const response = await fetch(`${import.meta.env.VITE_FLASK_URL}/ask_jarvis?stream=true`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ messageList }),
+    });
+    if (!response.ok || !response.body) throw new Error(`ask_jarvis failed: ${response.status}`);
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    let result: JarvisResult = { response: '' };
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += value;
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            const event = block.match(/^event: (.*)$/m)?.[1];
+            const data = block.match(/^data: (.*)$/m)?.[1];
+            if (!event || data === undefined) continue;
+            const payload = JSON.parse(data);
+            if (event === 'token') onToken(payload.text);
+            else if (event === 'done') result = payload;
+            else if (event === 'error') throw new Error(payload.detail);
+        }
+    }
+    return result;
+}
+
 const JarvisContext = createContext<JarvisContextType | null>(null);
 
 export function JarvisProvider({ children }: { children: React.ReactNode }) {
@@ -30,6 +69,7 @@ export function JarvisProvider({ children }: { children: React.ReactNode }) {
     const [askingPrompt, setAskingPrompt] = useState(false);
     const [messageList, setMessageList] = useState<Message[]>();
     const [referencedResources, setReferencedResources] = useState<string[]>([]);
+    const [streamingResponse, setStreamingResponse] = useState('');
 
     const currentAudioRef = useRef<HTMLAudioElement | null>(null);
 
@@ -83,17 +123,19 @@ export function JarvisProvider({ children }: { children: React.ReactNode }) {
             const userMessage = { role: "user", content: transcript };
             const updatedList = [...(messageList ?? []), userMessage];
             setMessageList(updatedList);
-            const response = await fetch(`${import.meta.env.VITE_FLASK_URL}/ask_jarvis`, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ messageList: updatedList }),
-            });
-            const data = await response.json();
+            setStreamingResponse('');
+            let data: JarvisResult = { response: '' };
+            try {
+                data = await streamJarvis(updatedList, (text) => setStreamingResponse((prev) => prev + text));
+            } catch (err) {
+                console.error('Jarvis error:', err);
+            }
             const jarvisMessage = { role: "assistant", content: data.response ?? "" };
             setMessageList([...updatedList, jarvisMessage]);
             setReferencedResources(data.referencedResources ?? []);
             if (data?.response) await speakText(data.response);
             setLoading(false);
+            setStreamingResponse('');
             setAskingPrompt(false);
             resetTranscript();
         }, 2000);
@@ -101,7 +143,7 @@ export function JarvisProvider({ children }: { children: React.ReactNode }) {
     }, [transcript, askingPrompt]);
 
     return (
-        <JarvisContext.Provider value={{ askingPrompt, transcript, referencedResources }}>
+        <JarvisContext.Provider value={{ askingPrompt, transcript, streamingResponse, referencedResources }}>
             {children}
         </JarvisContext.Provider>
     );